@@ -1,12 +1,21 @@
+import time
+
+# measuring the startup from the very first import
+STARTED = time.perf_counter()
+
 from dash import Dash, html, dcc
 from dash_bootstrap_components.themes import BOOTSTRAP, YETI, SLATE
 from dash_bootstrap_templates import ThemeSwitchAIO
 
 import stats
-from import_data import cities_data
-from main import move_atw
+import compare
+from import_data import loader
+import main  # registers the routing callbacks
 import map_creator
+import place_search
+import route_service
 import ids
+from strategies import DEFAULT_STRATEGY, STRATEGY_LABELS
 
 # Dash app layout and theme configuration
 
@@ -16,8 +25,29 @@ app = Dash(external_stylesheets=[BOOTSTRAP, dbc_css])
 
 app.title = 'Around the World'
 
-# Sorted list of allowed cities for the dropdown
-ALLOWED_TYPES = sorted(cities_data[ids.PLACE])
+# Seconds spent in each startup phase, printed once the layout is built
+STARTUP_TIMES = {'imports': time.perf_counter() - STARTED}
+
+# Population thresholds restricting the cities the route travels through
+POPULATION_OPTIONS = [
+    {'label': 'All cities', 'value': 0},
+    {'label': "Cities with more than 200'000 pops", 'value': ids.LARGE_CITY},
+    {'label': "Cities with more than 1'000'000 pops", 'value': 1_000_000},
+]
+
+# Countries the route can be restricted to (the first access loads the cities data), labelled with their full name
+COUNTRY_OPTIONS = [
+    {'label': name if isinstance(name, str) else code.upper(), 'value': code}
+    for code, name in (loader.routing_data()[['Country', 'Country name']]
+                       .drop_duplicates('Country')
+                       .sort_values('Country name')
+                       .itertuples(index=False))
+]
+
+# Strategies choosing the next city on the way east, see strategies.py
+STRATEGY_OPTIONS = [{'label': label, 'value': name} for name, label in STRATEGY_LABELS.items()]
+
+STARTUP_TIMES['data'] = time.perf_counter() - STARTED - sum(STARTUP_TIMES.values())
 
 # Dark/Light theme switch component
 theme_switch = ThemeSwitchAIO(aio_id='theme-switch', themes=[YETI, SLATE])
@@ -26,7 +56,15 @@ theme_switch = ThemeSwitchAIO(aio_id='theme-switch', themes=[YETI, SLATE])
 app.layout = html.Div(
     className='dbc app-layout',
     children=[
-        dcc.Store(id='trip', data=move_atw('London GB')),
+        # Handle of the displayed trip, whose records are kept on the server (see `main.load_trip`);
+        # filled by `main.start_route` once the page is loaded
+        dcc.Store(id='trip'),
+        # Route being computed in the background and the timer streaming it into 'trip'
+        dcc.Store(id='route-job'),
+        dcc.Interval(id='route-poll', interval=ids.ROUTE_POLL_MS, disabled=True),
+        # Handles of the routes compared with the displayed one and the timer collecting them
+        dcc.Store(id='compare-trips'),
+        dcc.Interval(id='compare-poll', interval=ids.ROUTE_POLL_MS, disabled=True),
         html.Div(
             className='grid-class',
             children=[
@@ -62,17 +100,71 @@ app.layout = html.Div(
                             dcc.Tab(label='Countries',
                                  children=[stats.list_render(app, 'countries')]),
 
+                            dcc.Tab(label='Compare',
+                                 children=[compare.render(app)]),
+
                         ]
                     ),
 
-                    # City selection dropdown
+                    # City selection dropdown, its options are searched on the server as the user types
                     dcc.Dropdown(
                         id='dropdown',
                         className='dropdown-class',
-                        options=ALLOWED_TYPES,
-                        value='London GB'
+                        options=['London GB'],
+                        value='London GB',
+                        placeholder='Search a city'
+                    ),
+
+                    # Comparison mode: other starting cities drawn on the same map
+                    dcc.Dropdown(
+                        id='compare-cities',
+                        className='dropdown-class',
+                        options=[],
+                        multi=True,
+                        placeholder=f'Compare with up to {ids.COMPARE_MAX} cities'
+                    ),
+
+                    # Routing subset: population threshold and countries
+                    dcc.Dropdown(
+                        id='min-population',
+                        className='dropdown-class',
+                        options=POPULATION_OPTIONS,
+                        value=0,
+                        clearable=False
+                    ),
+                    dcc.Dropdown(
+                        id='countries',
+                        className='dropdown-class',
+                        options=COUNTRY_OPTIONS,
+                        multi=True,
+                        placeholder='All countries'
                     ),
 
+                    # Routing strategy
+                    dcc.Dropdown(
+                        id='strategy',
+                        className='dropdown-class',
+                        options=STRATEGY_OPTIONS,
+                        value=DEFAULT_STRATEGY,
+                        clearable=False
+                    ),
+                    # Seed of the random strategy, only enabled with it (see `main.toggle_seed`)
+                    dcc.Input(
+                        id='seed',
+                        className='seed-input',
+                        type='number',
+                        min=0,
+                        step=1,
+                        value=ids.RANDOM_SEED,
+                        debounce=True,
+                        placeholder='Seed of the random strategy',
+                        disabled=True
+                    ),
+
+                    # Progress of the routes being computed, empty once they are displayed
+                    html.Div(id='route-status', className='route-status'),
+                    html.Div(id='compare-status', className='route-status'),
+
                     # Theme switch (light/dark)
                     html.Div(className= 'switch', children = [theme_switch])]
                 )
@@ -81,6 +173,15 @@ app.layout = html.Div(
     ]
 )
 
+# City search behind the dropdowns
+place_search.render(app, 'dropdown')
+place_search.render(app, 'compare-cities')
+route_service.register(app)
+
+STARTUP_TIMES['layout'] = time.perf_counter() - STARTED - sum(STARTUP_TIMES.values())
+print("Startup: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in STARTUP_TIMES.items())
+      + f", total {sum(STARTUP_TIMES.values()):.2f}s")
+
 # Run application in debug mode
 if __name__ == '__main__':
     app.run()
\ No newline at end of file
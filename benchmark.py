@@ -0,0 +1,361 @@
+"""
+benchmark.py
+------------
+
+Benchmarks of the routing pipeline, with regression tracking.
+
+Everything runs offline on the synthetic dataset of `synthetic_data.py`, so the
+numbers only depend on the code and the machine. For each start city of
+`BENCH_CITIES` the whole route is computed, recording the wall time, the
+latency distribution of the steps, the peak memory and the number of steps.
+The route from `SAMPLE_CITY` is also computed with every other routing strategy
+of `strategies.py`, and optimized over the cities above `ids.LARGE_CITY`
+(`optimizer.py`), recording how far the greedy route is from the optimal one.
+The building blocks of a step (neighbor searches, candidate scoring)
+and the map are timed separately on states sampled along a route.
+
+Results are compared with a stored baseline: a slower or more memory-hungry
+benchmark, beyond the tolerance, or a route with a different number of steps
+makes the run fail.
+
+With `--scale`, the routes are instead timed on datasets of growing size, to
+see how the neighbor search and the routing scale with the density of cities.
+
+Usage:
+    python benchmark.py                          # compare with benchmarks/baseline.json
+    python benchmark.py --update-baseline        # record the current numbers as baseline
+    python benchmark.py --tolerance 0.3 --output results.json
+    python benchmark.py --scale 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+
+import ids
+import synthetic_data
+from import_data import loader
+
+# start cities covering the different kinds of neighborhoods, by label
+BENCH_CITIES = {
+    "dense Europe": "Paris FR",
+    "sparse Pacific": "Apia WS",
+    "near antimeridian": "Anadyr RU",
+    "high latitude": "Tromso NO",
+}
+# route whose states are sampled for the component benchmarks
+SAMPLE_CITY = "Paris FR"
+BASELINE = os.path.join("benchmarks", "baseline.json")
+
+
+def _percentiles(seconds: list[float]) -> dict:
+    ms = 1000 * np.asarray(seconds)
+    return {"p50": round(float(np.percentile(ms, 50)), 3), "p90": round(float(np.percentile(ms, 90)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3), "max": round(float(ms.max()), 3)}
+
+
+def bench_route(routing, city: str, strategy: str = "fastest") -> dict:
+    """Compute the route from `city` with `strategy`, bypassing the caches, and measure it.
+
+    The route is computed twice: once timing every step, once under `tracemalloc`
+    for the peak memory, whose bookkeeping would distort the timings.
+
+    Returns:
+        dict: Steps, wall time, step latency percentiles (ms) and peak memory (MiB).
+    """
+    steps = []
+    legs = routing.iter_route(city, strategy=strategy)
+    start = last = time.perf_counter()
+    for _ in legs:
+        now = time.perf_counter()
+        steps.append(now - last)
+        last = now
+    wall = time.perf_counter() - start
+
+    tracemalloc.start()
+    routing.compute_route(city, strategy=strategy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"city": city, "steps": len(steps) - 1, "wall_s": round(wall, 4),
+            "step_ms": _percentiles(steps[1:]), "peak_mib": round(peak / 2**20, 2)}
+
+
+def bench_optimizer(routing, city: str) -> dict:
+    """Compute the greedy and the optimal route from `city` over the cities above `ids.LARGE_CITY`.
+
+    Returns:
+        dict: Wall time of the optimizer and the comparison of `optimizer.route_gap`.
+    """
+    from optimizer import RouteOptimizer, route_gap
+
+    greedy = routing.compute_route(city, ids.LARGE_CITY)
+    start = time.perf_counter()
+    optimal = RouteOptimizer(routing.routing_index(city, ids.LARGE_CITY), city).solve()
+    wall = time.perf_counter() - start
+    gap = route_gap(greedy, optimal)
+    return {"city": city, "wall_s": round(wall, 4), "greedy_time": gap.greedy_time,
+            "optimal_time": gap.optimal_time, "greedy_stops": gap.greedy_stops,
+            "optimal_stops": gap.optimal_stops, "gap": round(gap.gap, 4)}
+
+
+def _time_calls(calls: list[Callable[[], object]], repeat: int = 5) -> dict:
+    """Time each call `repeat` times, keeping the best run of each call."""
+    best = []
+    for call in calls:
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            runs.append(time.perf_counter() - start)
+        best.append(min(runs))
+    ms = 1000 * np.asarray(best)
+    return {"calls": len(best), "median_ms": round(float(np.median(ms)), 4),
+            "p90_ms": round(float(np.percentile(ms, 90)), 4)}
+
+
+def bench_components(routing, city: str, samples: int = 40) -> dict:
+    """Time the steps of the algorithm on states sampled along the route from `city`.
+
+    The route is replayed into a `TripBuilder`, so every sampled state sees the
+    visited cities of the real route at that point.
+
+    Returns:
+        dict: Call count, median and 90th percentile time (ms) per component.
+    """
+    import map_creator
+    from trip import TripBuilder
+    from utils import calculate_neighbors, calc_neighbors_home, rank_candidates
+
+    city_index = routing.routing_index(city)
+    data = city_index.data
+    records = routing.compute_route(city)
+    home = data[data[ids.PLACE] == city]
+    home_long = home["Longitude"].iloc[0]
+
+    east, near_home = [], []
+    trip = TripBuilder(home.iloc[0])
+    sampled = set(np.linspace(1, len(records) - 2, samples).astype(int))
+    for i, record in enumerate(records[1:-1], start=1):
+        trip.append(pd.Series(record))
+        if i not in sampled:
+            continue
+        current = pd.DataFrame([record])
+        # copy the visited set, since the trip keeps growing after the sample
+        snapshot = TripBuilder(home.iloc[0])
+        snapshot.visited = set(trip.visited)
+        if home_long - ids.DELTA_HOME <= record["Longitude"] <= home_long:
+            near_home.append((current, snapshot))
+        else:
+            east.append((current, snapshot))
+
+    neighbors = [calculate_neighbors(current, data, t, index=city_index) for current, t in east]
+    countries = [current["Country"].iloc[0] for current, _ in east]
+    route = pd.DataFrame.from_records(records)
+
+    results = {
+        "calculate_neighbors": _time_calls(
+            [lambda c=c, t=t: calculate_neighbors(c, data, t, index=city_index) for c, t in east]),
+        "rank_candidates": _time_calls(
+            [lambda n=n, c=c: rank_candidates(n, c) for n, c in zip(neighbors, countries)]),
+        "rank_candidates (n=50)": _time_calls(
+            [lambda n=n, c=c: rank_candidates(n, c, n=50) for n, c in zip(neighbors, countries)]),
+        "get_map": _time_calls([lambda: map_creator.get_map(route, True)]),
+        "move_atw (cached)": _time_calls([lambda: routing.move_atw(city)] * 10),
+    }
+    if near_home:
+        results["calc_neighbors_home"] = _time_calls(
+            [lambda c=c, t=t: calc_neighbors_home(c, data, home, t, index=city_index) for c, t in near_home])
+    return results
+
+
+def run_benchmarks(rows: int, seed: int) -> dict:
+    """Run every benchmark on a synthetic dataset of `rows` cities.
+
+    Returns:
+        dict: The dataset description, the route results by label and the component results.
+    """
+    loader.use(synthetic_data.generate_cities(rows, seed))
+    # imported after the data is set, so the routing indexes are built on it
+    import main as routing
+    from route_cache import RouteCache
+    from strategies import DEFAULT_STRATEGY, STRATEGIES
+    # keep the benchmark routes out of the on-disk cache
+    routing.route_cache = RouteCache(directory=None)
+
+    start = time.perf_counter()
+    routing.cities_index()
+    index_s = time.perf_counter() - start
+
+    routes = {label: bench_route(routing, city) for label, city in BENCH_CITIES.items()}
+    for strategy in STRATEGIES:
+        if strategy != DEFAULT_STRATEGY:
+            routes[f"strategy {strategy}"] = bench_route(routing, SAMPLE_CITY, strategy)
+    return {
+        "dataset": {"rows": rows, "seed": seed, "index_s": round(index_s, 4)},
+        "routes": routes,
+        "components": bench_components(routing, SAMPLE_CITY),
+        "optimizer": bench_optimizer(routing, SAMPLE_CITY),
+    }
+
+
+def bench_scaling(sizes: list[int], seed: int) -> list[dict]:
+    """Time the dataset generation, the index build and the routes at several dataset sizes.
+
+    Args:
+        sizes (list[int]): Numbers of synthetic cities.
+        seed (int): Seed of the synthetic datasets.
+
+    Returns:
+        list[dict]: One result per size, with the route results by label.
+    """
+    import main as routing
+
+    results = []
+    for rows in sizes:
+        start = time.perf_counter()
+        loader.use(synthetic_data.generate_cities(rows, seed))
+        generate_s = time.perf_counter() - start
+        routing.reset_routing()
+
+        start = time.perf_counter()
+        routing.cities_index()
+        index_s = time.perf_counter() - start
+
+        routes = {}
+        for label, city in BENCH_CITIES.items():
+            start = time.perf_counter()
+            steps = sum(1 for _ in routing.iter_route(city)) - 1
+            wall = time.perf_counter() - start
+            routes[label] = {"steps": steps, "wall_s": round(wall, 4),
+                             "step_ms": round(1000 * wall / max(steps, 1), 3)}
+        results.append({"rows": len(loader.data), "generate_s": round(generate_s, 3),
+                        "index_s": round(index_s, 3), "routes": routes})
+
+        print(f"{len(loader.data):>10} cities: generated in {generate_s:.2f}s, index in {index_s:.2f}s")
+        for label, r in routes.items():
+            print(f"    {label:<20}{r['steps']:>6} steps {r['wall_s']:>8.2f}s {r['step_ms']:>8.2f} ms/step")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List the regressions of `results` with respect to `baseline`.
+
+    Args:
+        results (dict): Output of `run_benchmarks`.
+        baseline (dict): A previous output of `run_benchmarks` on the same dataset.
+        tolerance (float): Allowed relative slowdown or memory growth (0.25 = 25%).
+
+    Returns:
+        list[str]: One message per regression; empty if there is none.
+    """
+    regressions = []
+
+    def check(name: str, metric: str, value: float, reference: float) -> None:
+        if value > reference * (1 + tolerance):
+            regressions.append(f"{name}: {metric} {value} vs baseline {reference} "
+                               f"(+{100 * (value / reference - 1):.0f}%)")
+
+    for label, base in baseline["routes"].items():
+        result = results["routes"].get(label)
+        if result is None:
+            regressions.append(f"route {label}: missing")
+            continue
+        if result["steps"] != base["steps"]:
+            regressions.append(f"route {label}: {result['steps']} steps vs baseline {base['steps']} "
+                               "(the route changed)")
+        check(f"route {label}", "wall_s", result["wall_s"], base["wall_s"])
+        check(f"route {label}", "step p50 ms", result["step_ms"]["p50"], base["step_ms"]["p50"])
+        check(f"route {label}", "peak_mib", result["peak_mib"], base["peak_mib"])
+
+    for name, base in baseline["components"].items():
+        result = results["components"].get(name)
+        if result is None:
+            regressions.append(f"{name}: missing")
+            continue
+        check(name, "median_ms", result["median_ms"], base["median_ms"])
+
+    if "optimizer" in baseline:
+        result, base = results["optimizer"], baseline["optimizer"]
+        if result["optimal_time"] > base["optimal_time"]:
+            regressions.append(f"optimizer: total time {result['optimal_time']} vs baseline "
+                               f"{base['optimal_time']} (the optimal route got slower)")
+        check("optimizer", "wall_s", result["wall_s"], base["wall_s"])
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    dataset = results["dataset"]
+    print(f"Synthetic dataset: {dataset['rows']} cities (seed {dataset['seed']}), "
+          f"index built in {dataset['index_s']:.2f}s")
+    print(f"{'route':<26}{'city':<12}{'steps':>6}{'wall s':>9}{'p50 ms':>9}{'p99 ms':>9}{'peak MiB':>10}")
+    for label, r in results["routes"].items():
+        print(f"{label:<26}{r['city']:<12}{r['steps']:>6}{r['wall_s']:>9.3f}"
+              f"{r['step_ms']['p50']:>9.3f}{r['step_ms']['p99']:>9.3f}{r['peak_mib']:>10.2f}")
+    print(f"{'component':<24}{'calls':>6}{'median ms':>11}{'p90 ms':>9}")
+    for name, r in results["components"].items():
+        print(f"{name:<24}{r['calls']:>6}{r['median_ms']:>11.3f}{r['p90_ms']:>9.3f}")
+    r = results["optimizer"]
+    print(f"optimizer from {r['city']} over cities above {ids.LARGE_CITY}: {r['wall_s']:.3f}s, "
+          f"{r['optimal_stops']} stops in {r['optimal_time']:.0f} vs greedy {r['greedy_stops']} stops "
+          f"in {r['greedy_time']:.0f} (greedy +{r['gap']:.1%})")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the routing pipeline on synthetic data.")
+    parser.add_argument("--rows", type=int, default=50_000, help="number of synthetic cities")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic dataset")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--scale", type=int, nargs="+", metavar="ROWS",
+                        help="only time the routes on datasets of these sizes, without baseline")
+    args = parser.parse_args(argv)
+
+    if args.scale:
+        results = bench_scaling(args.scale, args.seed)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        return
+
+    results = run_benchmarks(args.rows, args.seed)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if {k: baseline["dataset"][k] for k in ("rows", "seed")} != {"rows": args.rows, "seed": args.seed}:
+        sys.exit(f"The baseline was recorded on another dataset: {baseline['dataset']}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION ({len(regressions)}) against {args.baseline}:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
+    print(f"\nNo regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
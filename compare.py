@@ -0,0 +1,132 @@
+import pandas as pd
+from dash import html, Input, Output, State, Dash, no_update
+
+import ids
+import route_service
+from optimizer import BudgetExceeded, NoRouteHome
+from main import load_trip, normalize_strategy, normalize_subset, route_handle
+from stats import compute_stats
+
+
+def compared_routes(cities: list[str] | None, min_population: float | None, countries: list[str] | None,
+                    strategy: str | None = None, seed: int | None = None) -> tuple[list[dict], list[str], list[str]]:
+    """Look up the routes to compare, starting the missing ones on the route service.
+
+    Calling it again returns the routes completed meanwhile: finished routes are
+    served from the cache, and routes still running are shared, not restarted.
+
+    Args:
+        cities (list[str] | None): Starting cities, at most `ids.COMPARE_MAX` are kept.
+        min_population (float | None): Subset threshold, see `main.subset_index`.
+        countries (list[str] | None): Subset countries, see `main.subset_index`.
+        strategy (str | None, optional): Routing strategy, see `main.move_atw`. Defaults to None.
+        seed (int | None, optional): Seed of the "random" strategy, see `main.move_atw`. Defaults to None.
+
+    Returns:
+        tuple[list[dict], list[str], list[str]]: The handles of the completed routes
+        (see `main.route_handle`), the cities still being computed and one message
+        per failed city.
+    """
+    min_population, countries = normalize_subset(min_population, countries)
+    strategy, seed = normalize_strategy(strategy, seed)
+    handles, running, errors = [], [], []
+    for city in (cities or [])[:ids.COMPARE_MAX]:
+        try:
+            future = route_service.service.submit(city, min_population, countries and list(countries), strategy, seed)
+        except (ValueError, route_service.ServiceBusy) as error:
+            errors.append(f"{city}: {error}")
+            continue
+        if not future.done():
+            running.append(city)
+        elif isinstance(future.exception(), (BudgetExceeded, NoRouteHome)):
+            errors.append(str(future.exception()))
+        elif future.exception() is not None:
+            errors.append(f"{city}: route computation failed.")
+        else:
+            handles.append(route_handle(city, min_population, countries, len(future.result()), strategy, seed))
+    return handles, running, errors
+
+
+def compare_table(trips: dict[str, pd.DataFrame]) -> html.Table:
+    """Lay the statistics of several trips side by side, one column per starting city.
+
+    Args:
+        trips (dict[str, pd.DataFrame]): The trips by starting city.
+
+    Returns:
+        html.Table: One row per statistic of `stats.compute_stats`.
+    """
+    stats = {city: compute_stats(trip) for city, trip in trips.items()}
+    names = next(iter(stats.values())).keys() if stats else []
+    return html.Table(
+        className="compare-table",
+        children=[
+            html.Thead(html.Tr([html.Th("")] + [html.Th(city) for city in stats])),
+            html.Tbody([
+                html.Tr([html.Td(name, className="stat-title")]
+                        + [html.Td(values[name], className="stat-value") for values in stats.values()])
+                for name in names]),
+        ]
+    )
+
+
+def render(app: Dash) -> html.Div:
+    """
+    Create the comparison table and register the callbacks of the comparison mode.
+
+    The `compare-cities` dropdown selects up to `ids.COMPARE_MAX` other starting
+    cities. Their routes are computed concurrently by `route_service` with the
+    subset options and the strategy of the main route, overlaid on the map as they complete (see
+    `map_creator.get_map`) and their statistics are laid side by side with the ones
+    of the main route. The layout must hold the `compare-cities` dropdown, the
+    `compare-status` message, the `compare-trips` store and the `compare-poll` interval.
+
+    Args:
+        app (Dash): The Dash application instance used to register callbacks.
+
+    Returns:
+        html.Div: Container that will display the comparison table.
+    """
+
+    # Start the routes of the selected cities and collect them as they complete
+    @app.callback(
+        Output('compare-trips', 'data'),
+        Output('compare-poll', 'disabled'),
+        Output('compare-status', 'children'),
+        Input('compare-cities', 'value'),
+        Input('min-population', 'value'),
+        Input('countries', 'value'),
+        Input('strategy', 'value'),
+        Input('seed', 'value'),
+        Input('compare-poll', 'n_intervals'),
+        State('compare-trips', 'data'),
+    )
+    def update_compared(cities: list[str] | None, min_population: float | None, countries: list[str] | None,
+                        strategy: str | None, seed: int | None, _: int, current: list[dict] | None) -> tuple:
+        handles, running, errors = compared_routes(cities, min_population, countries, strategy, seed)
+        status = errors + ([f"Computing the routes from {', '.join(running)}..."] if running else [])
+        # only redraw the map when a route completed
+        return (no_update if handles == current else handles), not running, [html.Div(m) for m in status]
+
+    # Stats of the main route and of the compared ones, side by side
+    @app.callback(
+        Output('compare-output', 'children'),
+        Input('trip', 'data'),
+        Input('compare-trips', 'data'),
+    )
+    def update_table(handle: dict | None, compared: list[dict] | None) -> html.Table:
+        trips = {}
+        for h in [handle] + (compared or []):
+            trip = load_trip(h)
+            if trip is not None and len(trip) > 1:
+                trips.setdefault(trip[ids.PLACE].iloc[0], trip)
+        if not trips:
+            return no_update
+        return compare_table(trips)
+
+    # Initial empty table
+    return html.Div(
+        id='compare-output',
+        className="stats-container",
+        children=compare_table({})
+    )
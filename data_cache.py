@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# bump when the on-disk layout changes, so older caches are rebuilt
+FORMAT_VERSION = 2
+MANIFEST = 'manifest.json'
+# separator between the values of a string column; must not appear in the data
+SEPARATOR = '\x00'
+
+
+def file_signature(path: str, digest: bool = True) -> dict:
+    """Describe a source file by its size, modification time and, optionally, SHA-256 hash.
+
+    Args:
+        path (str): Path of the file.
+        digest (bool, optional): Whether to hash the file content. Defaults to True.
+
+    Returns:
+        dict: The file signature.
+    """
+    stat = os.stat(path)
+    signature = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if digest:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        signature["sha256"] = sha.hexdigest()
+    return signature
+
+
+def _same_source(recorded: dict, path: str) -> bool:
+    """Check a source file against its recorded signature.
+
+    The size and modification time are compared first; the content is only hashed
+    again when they differ, so an unchanged source costs a single `stat`.
+    """
+    current = file_signature(path, digest=False)
+    if current["size"] != recorded["size"]:
+        return False
+    if current["mtime_ns"] == recorded["mtime_ns"]:
+        return True
+    return file_signature(path)["sha256"] == recorded["sha256"]
+
+
+def _write_strings(path: str, values: np.ndarray) -> np.ndarray:
+    """Write a string array as one UTF-8 blob and return its missing-value mask."""
+    missing = pd.isna(values)
+    strings = ['' if na else str(v) for v, na in zip(values, missing)]
+    blob = SEPARATOR.join(strings)
+    if blob.count(SEPARATOR) != max(len(strings) - 1, 0):
+        raise ValueError("String values must not contain the column separator.")
+    with open(path, "wb") as f:
+        f.write(blob.encode("utf-8"))
+    return missing
+
+
+def _read_strings(path: str, missing: np.ndarray) -> np.ndarray:
+    """Read a string array written by `_write_strings`."""
+    with open(path, "rb") as f:
+        blob = f.read().decode("utf-8")
+    values = np.array(blob.split(SEPARATOR) if blob or len(missing) else [], dtype=object)
+    values[missing] = np.nan
+    return values
+
+
+def save_dataset(data: pd.DataFrame, directory: str, sources: dict[str, str]) -> None:
+    """Write a DataFrame to a columnar binary cache.
+
+    Numeric columns are saved as `.npy` files that can be memory-mapped, string
+    columns as a UTF-8 blob plus a missing-value mask and categorical columns as
+    integer codes plus their categories. The manifest records the columns and the
+    signature of each source file the data was built from.
+
+    Args:
+        data (pd.DataFrame): The DataFrame to cache. Its index is not stored.
+        directory (str): Cache directory; its previous content is replaced.
+        sources (dict[str, str]): Source name -> path of the files the data was built from.
+    """
+    tmp_dir = directory.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, (name, column) in enumerate(data.items()):
+        stem = os.path.join(tmp_dir, f"col{i}")
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            kind = "category"
+            np.save(stem + ".npy", column.cat.codes.to_numpy())
+            categories = column.cat.categories.to_numpy(dtype=object)
+            np.save(stem + ".na.npy", _write_strings(stem + ".bin", categories))
+        elif pd.api.types.is_numeric_dtype(column.dtype):
+            kind = "numeric"
+            np.save(stem + ".npy", column.to_numpy())
+        else:
+            kind = "string"
+            np.save(stem + ".na.npy", _write_strings(stem + ".bin", column.to_numpy(dtype=object)))
+        columns.append({"name": name, "kind": kind, "file": f"col{i}"})
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "rows": len(data),
+        "columns": columns,
+        "sources": {name: file_signature(path) for name, path in sources.items()},
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # swap the complete cache in place of the previous one
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def read_manifest(directory: str) -> dict | None:
+    """Return the manifest of a cache directory, or None if there is no usable cache."""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get("version") == FORMAT_VERSION else None
+
+
+def is_valid(manifest: dict, sources: dict[str, str] | None = None) -> bool:
+    """Check that a cache still matches its source files.
+
+    Args:
+        manifest (dict): The cache manifest.
+        sources (dict[str, str] | None, optional): Source name -> path the data should
+            come from. When None, the recorded sources are checked where they still
+            exist, and a cache whose sources are gone (e.g. offline) is accepted.
+
+    Returns:
+        bool: True if the cache can be used.
+    """
+    recorded = manifest["sources"]
+    if sources is not None:
+        return recorded.keys() == sources.keys() and all(
+            _same_source(recorded[name], path) for name, path in sources.items())
+    return all(_same_source(info, info["path"]) for info in recorded.values() if os.path.exists(info["path"]))
+
+
+def load_dataset(directory: str, sources: dict[str, str] | None = None, columns: list[str] | None = None,
+                 mmap: bool = True) -> pd.DataFrame | None:
+    """Load a DataFrame written by `save_dataset`.
+
+    Args:
+        directory (str): Cache directory.
+        sources (dict[str, str] | None, optional): Expected source files, see `is_valid`.
+            Defaults to None.
+        columns (list[str] | None, optional): Columns to load, in order. Defaults to None,
+            loading all of them in their original order.
+        mmap (bool, optional): Memory-map numeric columns (read-only) instead of
+            reading them into memory. Defaults to True.
+
+    Returns:
+        pd.DataFrame | None: The cached data, or None if the cache is missing or stale.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None or not is_valid(manifest, sources):
+        return None
+
+    mmap_mode = "r" if mmap else None
+    loaded = {}
+    for column in manifest["columns"]:
+        if columns is not None and column["name"] not in columns:
+            continue
+        stem = os.path.join(directory, column["file"])
+        if column["kind"] == "numeric":
+            loaded[column["name"]] = np.load(stem + ".npy", mmap_mode=mmap_mode)
+        elif column["kind"] == "category":
+            categories = _read_strings(stem + ".bin", np.load(stem + ".na.npy"))
+            loaded[column["name"]] = pd.Categorical.from_codes(np.load(stem + ".npy"), categories)
+        else:
+            loaded[column["name"]] = _read_strings(stem + ".bin", np.load(stem + ".na.npy"))
+
+    if columns is not None:
+        loaded = {name: loaded[name] for name in columns if name in loaded}
+    return pd.DataFrame(loaded, copy=False)
@@ -1,2 +1,19 @@
 PLACE = 'City_Country'
 DELTA_HOME = 10.0
+ROUTE_CACHE_DIR = '.route_cache'
+ROUTE_CACHE_SIZE = 64
+ROUTE_STORE_DIR = '.route_store'
+DATA_CACHE_DIR = '.data_cache'
+SUBSET_CACHE_SIZE = 8
+LARGE_CITY = 200_000
+ROUTE_POLL_MS = 1000
+TRIP_STORE_SIZE = 32
+ROUTE_WORKERS = 2
+ROUTE_QUEUE_SIZE = 16
+ROUTE_TIMEOUT_S = 30.0
+COMPARE_MAX = 4
+SUCCESSOR_GRAPH_DIR = '.successor_graph'
+SUCCESSORS = 16
+RANDOM_SEED = 0
+OPTIMIZER_BUDGET_S = 10.0
+ROUTE_JOBS_MAX = 8
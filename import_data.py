@@ -1,12 +1,24 @@
+import numpy as np
 import pandas as pd
-import kagglehub
 import os
+import threading
 
 import ids
+import data_cache
+
+# local directory holding 'worldcitiespop.csv' and 'wikipedia-iso-country-codes.csv';
+# when set, the data is read from there instead of being downloaded with kagglehub
+LOCAL_DATA_DIR = os.environ.get('ATW_DATA_DIR')
+
+# when set, the loader serves a synthetic dataset of about this many cities (see synthetic_data.py)
+SYNTHETIC_ROWS = int(os.environ['ATW_SYNTHETIC_ROWS']) if os.environ.get('ATW_SYNTHETIC_ROWS') else None
+
+CITIES_FILE = 'worldcitiespop.csv'
+COUNTRIES_FILE = 'wikipedia-iso-country-codes.csv'
+
+# the only columns needed to compute and display a route
+ROUTING_COLUMNS = [ids.PLACE, 'Latitude', 'Longitude', 'Population', 'Country', 'Country name']
 
-# defining path for data import
-path1 = kagglehub.dataset_download("max-mind/world-cities-database")
-path2 = kagglehub.dataset_download("juanumusic/countries-iso-codes")
 
 def import_data(path: str) -> pd.DataFrame:
     """Imports the world cities dataset from the specified directory.
@@ -20,26 +32,233 @@ def import_data(path: str) -> pd.DataFrame:
     Returns:
         pd.DataFrame: A DataFrame containing the world cities data.
     """
-    return pd.read_csv(os.path.join(path, 'worldcitiespop.csv'), dtype={'Region': str})
-
-raw_data = import_data(path1)
-# data cleaning
-# drop obs with NA value in 'Population' or 'City'
-cities_data: pd.DataFrame = raw_data.dropna(subset=["Population", "City"])
-# since multiples cities have the same name create a new variable 'City_Country'
-cities_data.insert(2,
-                   "City_Country",
-                   cities_data["AccentCity"] + " " + cities_data["Country"].str.upper())
-
-cities_data = cities_data.loc[cities_data.groupby(ids.PLACE)["Population"].idxmax()].reset_index(drop=True)
-
-# importing a dataset with full country names with associated Alpha-2 code
-cntry_names = pd.read_csv(os.path.join(path2, 'wikipedia-iso-country-codes.csv'))
-# changing the column name with a shorter one
-cntry_names = cntry_names.rename(columns={"English short name lower case": 'Country name'})
-# creating a temporary column for merging
-cities_data['Country_upper'] = cities_data['Country'].str.upper()
-# merging the datasets
-cities_data = cities_data.merge(cntry_names, left_on='Country_upper', right_on='Alpha-2 code', how='left')
-# deleting unnecessary columns
-cities_data = cities_data.drop(columns=['Country_upper', 'Alpha-2 code', 'Alpha-3 code', 'Numeric code', 'ISO 3166-2'])
\ No newline at end of file
+    return pd.read_csv(os.path.join(path, CITIES_FILE), dtype={'Region': str})
+
+
+def source_files(data_dir: str | None = LOCAL_DATA_DIR) -> dict[str, str]:
+    """Locate the raw dataset files.
+
+    Args:
+        data_dir (str | None, optional): Local directory containing both CSV files.
+            Defaults to `LOCAL_DATA_DIR`; when None, the datasets are downloaded with kagglehub.
+
+    Returns:
+        dict[str, str]: Paths of the 'cities' and 'countries' CSV files.
+    """
+    if data_dir is not None:
+        return {"cities": os.path.join(data_dir, CITIES_FILE),
+                "countries": os.path.join(data_dir, COUNTRIES_FILE)}
+
+    # imported here so that loading from a local directory or the cache works offline
+    import kagglehub
+    path1 = kagglehub.dataset_download("max-mind/world-cities-database")
+    path2 = kagglehub.dataset_download("juanumusic/countries-iso-codes")
+    return {"cities": os.path.join(path1, CITIES_FILE),
+            "countries": os.path.join(path2, COUNTRIES_FILE)}
+
+
+def clean_data(sources: dict[str, str]) -> pd.DataFrame:
+    """Build the cleaned cities dataset from the raw CSV files.
+
+    Args:
+        sources (dict[str, str]): Paths of the 'cities' and 'countries' CSV files.
+
+    Returns:
+        pd.DataFrame: One row per populated `City_Country`, with the full country name.
+    """
+    raw_data = import_data(os.path.dirname(sources["cities"]))
+    # data cleaning
+    # drop obs with NA value in 'Population' or 'City'
+    cities_data: pd.DataFrame = raw_data.dropna(subset=["Population", "City"])
+    # since multiples cities have the same name create a new variable 'City_Country'
+    cities_data.insert(2,
+                       "City_Country",
+                       cities_data["AccentCity"] + " " + cities_data["Country"].str.upper())
+
+    cities_data = cities_data.loc[cities_data.groupby(ids.PLACE)["Population"].idxmax()].reset_index(drop=True)
+
+    # importing a dataset with full country names with associated Alpha-2 code
+    cntry_names = pd.read_csv(sources["countries"])
+    # changing the column name with a shorter one
+    cntry_names = cntry_names.rename(columns={"English short name lower case": 'Country name'})
+    # creating a temporary column for merging
+    cities_data['Country_upper'] = cities_data['Country'].str.upper()
+    # merging the datasets
+    cities_data = cities_data.merge(cntry_names, left_on='Country_upper', right_on='Alpha-2 code', how='left')
+    # deleting unnecessary columns
+    return cities_data.drop(columns=['Country_upper', 'Alpha-2 code', 'Alpha-3 code', 'Numeric code', 'ISO 3166-2'])
+
+
+def compact_dtypes(data: pd.DataFrame, max_unique_ratio: float = 0.5) -> pd.DataFrame:
+    """Convert the columns of a DataFrame to memory-efficient dtypes without changing any value.
+
+    - float columns are stored as float32 when every value survives the round trip,
+      and as the smallest integer type when they only hold whole numbers;
+    - string columns whose share of distinct values is at most `max_unique_ratio`
+      are dictionary-encoded as categoricals (e.g. country codes and names).
+
+    Args:
+        data (pd.DataFrame): The DataFrame to convert.
+        max_unique_ratio (float, optional): Maximum ratio of distinct values to rows for
+            a string column to become categorical. Defaults to 0.5.
+
+    Returns:
+        pd.DataFrame: A DataFrame holding the same values with compact dtypes.
+    """
+    compact = {}
+    for name, column in data.items():
+        if pd.api.types.is_float_dtype(column.dtype):
+            values = column.to_numpy()
+            if column.notna().all() and np.array_equal(values, np.round(values)):
+                column = pd.to_numeric(column, downcast='integer')
+            elif np.array_equal(values.astype(np.float32).astype(values.dtype), values, equal_nan=True):
+                column = column.astype(np.float32)
+        elif pd.api.types.is_object_dtype(column.dtype) or pd.api.types.is_string_dtype(column.dtype):
+            if column.nunique() <= max_unique_ratio * len(column):
+                column = column.astype('category')
+        compact[name] = column
+    return pd.DataFrame(compact)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Compare the memory used by each column of two versions of a DataFrame.
+
+    Args:
+        before (pd.DataFrame): The original DataFrame.
+        after (pd.DataFrame): The converted DataFrame.
+
+    Returns:
+        pd.DataFrame: Bytes per column before and after, their dtypes and the saved share,
+        with a final 'Total' row.
+    """
+    report = pd.DataFrame({
+        'dtype before': before.dtypes.astype(str),
+        'bytes before': before.memory_usage(index=False, deep=True),
+        'dtype after': after.dtypes.astype(str),
+        'bytes after': after.memory_usage(index=False, deep=True),
+    })
+    report.loc['Total'] = ['', report['bytes before'].sum(), '', report['bytes after'].sum()]
+    report['saved %'] = (100 * (1 - report['bytes after'] / report['bytes before'])).round(1)
+    return report
+
+
+def load_cities_data(data_dir: str | None = LOCAL_DATA_DIR, cache_dir: str = ids.DATA_CACHE_DIR,
+                     columns: list[str] | None = None) -> pd.DataFrame:
+    """Load the cleaned cities dataset, from the binary cache when it is up to date.
+
+    On a cache miss the raw files are cleaned with `clean_data`, converted with
+    `compact_dtypes` and written to `cache_dir` together with the signatures of the
+    source files, so later starts skip both the download and the parsing.
+
+    Args:
+        data_dir (str | None, optional): Local directory with the raw CSV files,
+            see `source_files`. Defaults to `LOCAL_DATA_DIR`.
+        cache_dir (str, optional): Directory of the binary cache. Defaults to `ids.DATA_CACHE_DIR`.
+        columns (list[str] | None, optional): Columns to load. Defaults to None, loading all.
+
+    Returns:
+        pd.DataFrame: The cleaned cities dataset.
+    """
+    # with a local directory the cache must match its files; otherwise trust the recorded sources
+    sources = source_files(data_dir) if data_dir is not None else None
+    cities_data = data_cache.load_dataset(cache_dir, sources, columns=columns)
+    if cities_data is None:
+        sources = sources or source_files(None)
+        cities_data = compact_dtypes(clean_data(sources))
+        data_cache.save_dataset(cities_data, cache_dir, sources)
+        if columns is not None:
+            cities_data = cities_data[columns]
+    return cities_data
+
+
+class CitiesLoader:
+    """Load the cleaned cities dataset on first access.
+
+    Nothing is read when the loader is created. The full dataset is built the first
+    time `data` is accessed, while `projection` only loads the requested columns
+    from the binary cache, so processes that do not need every column never hold
+    them in memory. Loaded frames are kept and shared by later calls.
+
+    With `synthetic_rows`, a synthetic dataset is generated instead (see
+    `synthetic_data.generate_cities`), so the whole app runs offline at any size.
+    """
+
+    def __init__(self, data_dir: str | None = LOCAL_DATA_DIR, cache_dir: str = ids.DATA_CACHE_DIR,
+                 synthetic_rows: int | None = SYNTHETIC_ROWS):
+        """
+        Args:
+            data_dir (str | None, optional): Local directory with the raw CSV files,
+                see `source_files`. Defaults to `LOCAL_DATA_DIR`.
+            cache_dir (str, optional): Directory of the binary cache. Defaults to `ids.DATA_CACHE_DIR`.
+            synthetic_rows (int | None, optional): Serve about this many synthetic cities
+                instead of the real dataset. Defaults to `SYNTHETIC_ROWS`.
+        """
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.synthetic_rows = synthetic_rows
+        self._frames: dict[tuple[str, ...] | None, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """The full cleaned cities dataset."""
+        return self._load(None)
+
+    def projection(self, columns: list[str]) -> pd.DataFrame:
+        """Return the dataset restricted to `columns`.
+
+        Args:
+            columns (list[str]): Columns to keep, in order.
+
+        Returns:
+            pd.DataFrame: The projected dataset.
+        """
+        return self._load(tuple(columns))
+
+    def use(self, data: pd.DataFrame) -> None:
+        """Serve `data` instead of the real dataset, e.g. synthetic cities for benchmarks.
+
+        Call it before anything reads the data, or call `main.reset_routing` afterwards:
+        indexes built on the previous data are not rebuilt.
+
+        Args:
+            data (pd.DataFrame): The cleaned cities dataset to serve.
+        """
+        with self._lock:
+            self._frames = {None: data}
+
+    def routing_data(self) -> pd.DataFrame:
+        """Return the projection used for routing (see `ROUTING_COLUMNS`)."""
+        return self.projection(ROUTING_COLUMNS)
+
+    def _load(self, columns: tuple[str, ...] | None) -> pd.DataFrame:
+        with self._lock:
+            if None not in self._frames and self.synthetic_rows is not None:
+                # imported here since synthetic_data builds on this module
+                from synthetic_data import generate_cities
+                self._frames[None] = generate_cities(self.synthetic_rows)
+            if columns not in self._frames:
+                if None in self._frames:
+                    # the full dataset is already in memory: project it instead of reading again
+                    self._frames[columns] = self._frames[None][list(columns)]
+                else:
+                    self._frames[columns] = load_cities_data(self.data_dir, self.cache_dir,
+                                                             None if columns is None else list(columns))
+            return self._frames[columns]
+
+
+# default loader shared by the application
+loader = CitiesLoader()
+
+
+def __getattr__(name: str):
+    # keep `from import_data import cities_data` working, loading the data on first use
+    if name == "cities_data":
+        return loader.data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    # print the memory saved by the compact layout of the cleaned dataset
+    raw = clean_data(source_files())
+    print(memory_report(raw, compact_dtypes(raw)).to_string())
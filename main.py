@@ -12,73 +12,610 @@ Modules:
     map_creator: Functions to generate maps and render them in app_render.
     stats: Functions to calculate statistics about the data and render them in app_render.
 """
+import logging
+from collections.abc import Iterator
+from functools import cache, lru_cache
+
+import numpy as np
 import pandas as pd
-from dash import Output, Input, callback
+from dash import Output, Input, State, callback, no_update
 
-from utils import calculate_neighbors, calc_neighbors_home, calculate_time, get_top3, create_move, fastest_long, go_home
+from utils import (calculate_neighbors, calc_neighbors_home, rank_candidates, homeward_candidate,
+                   candidate_row, with_metrics)
 import ids
-# importing the clean dataset with the cities
-from import_data import cities_data
+from spatial_index import CityIndex
+from trip import TripBuilder
+from route_cache import RouteCache, RouteKey, dataset_fingerprint
+from route_store import RouteStore
+from route_jobs import JobRegistry, JobsBusy
+from successor_graph import SuccessorGraph
+from strategies import DEFAULT_STRATEGY, OPTIMAL_STRATEGY, Strategy, get_strategy
+from optimizer import BudgetExceeded, NoRouteHome, RouteOptimizer
+from tracing import RouteTracer
+from trip_store import TripStore
+# loader of the clean dataset with the cities
+from import_data import loader
+
+logger = logging.getLogger(__name__)
+
+# computed routes, kept in memory and on disk across restarts
+route_cache = RouteCache()
+
+# routes being computed in the background for the UI
+route_jobs = JobRegistry()
+
+# trips read by the UI callbacks, addressed by the handles held in the `trip` store
+trip_store = TripStore()
+
+
+@cache
+def cities_index() -> CityIndex:
+    """Spatial index over the routing columns of the cities dataset, built on first use.
+
+    Its `data` attribute holds the dataset the routes are computed on.
+    """
+    return CityIndex(loader.routing_data())
+
+
+@cache
+def cities_fingerprint() -> str:
+    """Fingerprint of the routing dataset, computed once per process."""
+    return dataset_fingerprint(cities_index().data)
+
+
+def reset_routing() -> None:
+    """Forget the indexes and routes built on the current dataset.
+
+    Call it after `loader.use` replaced the data, e.g. to benchmark several datasets
+    in one process. Routes cached on disk are keyed by the dataset fingerprint, so
+    they are never served for another dataset.
+    """
+    cities_index.cache_clear()
+    cities_fingerprint.cache_clear()
+    subset_index.cache_clear()
+    route_store.cache_clear()
+    successor_graph.cache_clear()
+
+
+def normalize_subset(min_population: float | None = None,
+                     countries: list[str] | None = None) -> tuple[float | None, tuple[str, ...] | None]:
+    """Bring the subset options to a canonical, hashable form.
+
+    A zero threshold and an empty country list both mean "no restriction" and become None.
+    The threshold is a float whatever its source (the UI sends an int, the API a float),
+    and country codes are lowercase, as in the data, so every caller builds the same route key.
+
+    Args:
+        min_population (float | None, optional): Minimum population of the candidate cities.
+        countries (list[str] | None, optional): Country codes of the candidate cities.
+
+    Returns:
+        tuple[float | None, tuple[str, ...] | None]: The threshold and the sorted country codes.
+    """
+    countries = tuple(sorted({c.strip().lower() for c in countries or ()} - {''})) or None
+    return (float(min_population) if min_population else None), countries
+
+
+@lru_cache(maxsize=ids.SUBSET_CACHE_SIZE)
+def subset_index(min_population: float | None = None, countries: tuple[str, ...] | None = None) -> CityIndex:
+    """Spatial index restricted to the cities of a population threshold and/or a set of countries.
+
+    Each subset is filtered and indexed once and then shared by every route using it,
+    so filtered routing runs at the speed of the subset size.
+
+    Args:
+        min_population (float | None, optional): Minimum population. Defaults to None (no threshold).
+        countries (tuple[str, ...] | None, optional): Country codes, as in the "Country"
+            column. Defaults to None (every country).
+
+    Raises:
+        ValueError: If a country code is not in the dataset.
+
+    Returns:
+        CityIndex: Index over the matching cities.
+    """
+    if min_population is None and countries is None:
+        return cities_index()
+
+    data = cities_index().data
+    if countries is not None:
+        unknown = sorted(set(countries) - set(data["Country"].unique()))
+        if unknown:
+            raise ValueError(f"Unknown country codes: {', '.join(unknown)}.")
+    mask = pd.Series(True, index=data.index)
+    if min_population is not None:
+        mask &= data["Population"] >= min_population
+    if countries is not None:
+        mask &= data["Country"].isin(countries)
+    return CityIndex(data.loc[mask].reset_index(drop=True))
+
+
+def routing_index(str_city: str, min_population: float | None = None,
+                  countries: tuple[str, ...] | None = None) -> CityIndex:
+    """Spatial index a route from `str_city` is computed on.
+
+    The starting city is always part of the candidates, since the route has to
+    return to it: when the subset does not contain it, it is added to a copy of
+    the subset.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Subset threshold, see `subset_index`.
+        countries (tuple[str, ...] | None, optional): Subset countries, see `subset_index`.
+
+    Returns:
+        CityIndex: Index over the candidate cities.
+    """
+    city_index = subset_index(min_population, countries)
+    if (city_index.data[ids.PLACE] == str_city).any():
+        return city_index
+
+    full_data = cities_index().data
+    start_point = full_data[full_data[ids.PLACE] == str_city]
+    return CityIndex(pd.concat([city_index.data, start_point], ignore_index=True))
+
+
+def normalize_strategy(strategy: str | None = None, seed: int | None = None) -> tuple[str, int | None]:
+    """Validate a strategy name and keep its seed only if the strategy draws at random.
+
+    Args:
+        strategy (str | None, optional): Name of a strategy of `strategies.STRATEGIES`, or
+            `strategies.OPTIMAL_STRATEGY`. Defaults to None, the default strategy.
+        seed (int | None, optional): Seed of the "random" strategy. Defaults to None, `ids.RANDOM_SEED`.
+
+    Raises:
+        ValueError: If the strategy is unknown or the seed is negative.
+
+    Returns:
+        tuple[str, int | None]: The strategy and its seed (None when unused).
+    """
+    strategy = strategy or DEFAULT_STRATEGY
+    if strategy != OPTIMAL_STRATEGY:
+        get_strategy(strategy)
+    if strategy != "random":
+        return strategy, None
+    seed = ids.RANDOM_SEED if seed is None else int(seed)
+    if seed < 0:
+        raise ValueError(f"The seed must be a non-negative integer, not {seed}.")
+    return strategy, seed
+
+
+def routing_params(min_population: float | None = None, countries: tuple[str, ...] | None = None,
+                   strategy: str = DEFAULT_STRATEGY, seed: int | None = None) -> tuple[tuple[str, object], ...]:
+    """Algorithm parameters a route depends on, as sorted (name, value) pairs."""
+    params = [("delta_home", ids.DELTA_HOME)]
+    if min_population is not None:
+        params.append(("min_population", min_population))
+    if countries is not None:
+        params.append(("countries", countries))
+    if strategy != DEFAULT_STRATEGY:
+        params.append(("strategy", strategy))
+    if seed is not None:
+        params.append(("seed", seed))
+    return tuple(sorted(params))
+
+
+def route_key(str_city: str, min_population: float | None = None, countries: tuple[str, ...] | None = None,
+              strategy: str = DEFAULT_STRATEGY, seed: int | None = None) -> RouteKey:
+    """Build the cache key of the route starting from `str_city`.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Subset threshold, see `subset_index`.
+        countries (tuple[str, ...] | None, optional): Subset countries, see `subset_index`.
+        strategy (str, optional): Routing strategy, see `normalize_strategy`. Defaults to the default one.
+        seed (int | None, optional): Seed of the strategy, see `normalize_strategy`. Defaults to None.
+
+    Returns:
+        RouteKey: Key made of the dataset fingerprint, the city and the routing parameters.
+    """
+    return RouteKey(cities_fingerprint(), str_city, routing_params(min_population, countries, strategy, seed))
+
+
+@cache
+def route_store(params: tuple[tuple[str, object], ...] | None = None) -> RouteStore:
+    """Store of the routes precomputed in batch (see `precompute.py`) for the current data.
+
+    Args:
+        params (tuple | None, optional): Routing parameters, see `routing_params`.
+            Defaults to None, the parameters of unfiltered routes.
+
+    Returns:
+        RouteStore: The store for those parameters.
+    """
+    return RouteStore(ids.ROUTE_STORE_DIR, cities_fingerprint(), params or routing_params())
+
+
+@cache
+def successor_graph() -> SuccessorGraph | None:
+    """Eastward successors of every city of the whole dataset, when precomputed (see `successor_graph.py`)."""
+    return SuccessorGraph.load(ids.SUCCESSOR_GRAPH_DIR, cities_fingerprint())
+
+
+def cached_route(key: RouteKey) -> list[dict] | None:
+    """Return an already computed route from the cache or the batch store, or None.
+
+    Args:
+        key (RouteKey): The route identifier.
+
+    Returns:
+        list[dict] | None: The route records, or None if the route was never computed.
+    """
+    trip = route_cache.get(key)
+    if trip is None:
+        # fall back to the batch-precomputed routes
+        trip = route_store(key.params).get(key.city)
+        if trip is not None:
+            route_cache.put(key, trip)
+    return trip
+
+
+def move_atw(str_city: str, min_population: float | None = None, countries: list[str] | None = None,
+             strategy: str | None = None, seed: int | None = None) -> list[dict]:
+    """Return the trip around the world starting from `str_city`, using the route cache.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Only travel through cities at least this
+            populated. Defaults to None.
+        countries (list[str] | None, optional): Only travel through cities of these country
+            codes. Defaults to None.
+        strategy (str | None, optional): Routing strategy, see `strategies.py`, or "optimal" for
+            the minimum total time (`optimizer.py`). Defaults to None, the fastest longitudinal speed.
+        seed (int | None, optional): Seed of the "random" strategy. Defaults to None, `ids.RANDOM_SEED`.
+
+    Returns:
+        list[dict]: The visited cities in order.
+    """
+    min_population, countries = normalize_subset(min_population, countries)
+    strategy, seed = normalize_strategy(strategy, seed)
+    key = route_key(str_city, min_population, countries, strategy, seed)
+    trip = cached_route(key)
+    if trip is None:
+        trip = compute_route(str_city, min_population, countries, strategy=strategy, seed=seed)
+        route_cache.put(key, trip)
+    return trip
+
+
+def route_handle(str_city: str, min_population: float | None = None, countries: tuple[str, ...] | None = None,
+                 stops: int = 0, strategy: str = DEFAULT_STRATEGY, seed: int | None = None) -> dict:
+    """Build the handle of a computed route, as held in the `trip` store.
+
+    The handle only names the route; its records stay on the server and are read
+    back with `load_trip`, by any process sharing the route cache.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Subset threshold, see `subset_index`.
+        countries (tuple[str, ...] | None, optional): Subset countries, see `subset_index`.
+        stops (int, optional): Number of stops of the route. Defaults to 0.
+        strategy (str, optional): Routing strategy, see `normalize_strategy`. Defaults to the default one.
+        seed (int | None, optional): Seed of the strategy, see `normalize_strategy`. Defaults to None.
+
+    Returns:
+        dict: The JSON-serializable handle.
+    """
+    return {"city": str_city, "min_population": min_population,
+            "countries": list(countries) if countries else None, "stops": stops,
+            "strategy": strategy, "seed": seed}
+
+
+def load_trip(handle: dict | None) -> pd.DataFrame | None:
+    """Resolve a handle of the `trip` store into the trip it names.
+
+    Handles either name a computed route (see `route_handle`) or the first `stops`
+    stops of a route still being computed by a background job. Each trip is built
+    once in columnar form and shared through `trip_store` by every callback.
+
+    Args:
+        handle (dict | None): The content of the `trip` store.
+
+    Returns:
+        pd.DataFrame | None: The trip, one row per visited city, or None if the
+        handle is empty or its route is no longer available.
+    """
+    if not handle:
+        return None
+
+    if "job" in handle:
+        # one partial trip per job, replaced as the route grows
+        handle_id = f"job:{handle['job']}"
+        trip = trip_store.get(handle_id, partial=True)
+        if trip is None or len(trip) != handle["stops"]:
+            job = route_jobs.get(handle["job"])
+            if job is None:
+                return None
+            trip = trip_store.put(handle_id, job.head(handle["stops"]), partial=True)
+        return trip
+
+    min_population, countries = normalize_subset(handle["min_population"], handle["countries"])
+    strategy, seed = normalize_strategy(handle.get("strategy"), handle.get("seed"))
+    key = route_key(handle["city"], min_population, countries, strategy, seed)
+    handle_id = f"route:{key.fingerprint}:{key.digest()}"
+    trip = trip_store.get(handle_id)
+    if trip is None:
+        records = cached_route(key)
+        if records is None:
+            return None
+        trip = trip_store.put(handle_id, records)
+    return trip
+
+
+@callback(
+    Output('trip', 'data', allow_duplicate=True),
+    Output('route-job', 'data'),
+    Output('route-poll', 'disabled', allow_duplicate=True),
+    Output('route-status', 'children', allow_duplicate=True),
+    Input('dropdown', 'value'),
+    Input('min-population', 'value'),
+    Input('countries', 'value'),
+    Input('strategy', 'value'),
+    Input('seed', 'value'),
+    State('route-job', 'data'),
+    prevent_initial_call='initial_duplicate'
+)
+def start_route(str_city: str, min_population: float | None, countries: list[str] | None,
+                strategy: str | None, seed: int | None, job_handle: dict | None) -> tuple:
+    """Serve a cached route at once, or start computing it in the background.
+
+    Any route still being computed for this page is cancelled first. A new
+    computation is then streamed into the `trip` store by `poll_route`, unless
+    `ids.ROUTE_JOBS_MAX` routes are already running: the page then shows a busy
+    message and keeps its current route. Clearing the city only cancels the
+    running route. This also runs when the page loads, so the default route is
+    never computed while the layout is built.
+
+    Returns:
+        tuple: The trip handle (or no update), the started job with the handle of its
+        route, whether polling is disabled and the status message.
+    """
+    route_jobs.cancel(job_handle and job_handle["job"])
+    if not str_city:
+        # the city dropdown was cleared: keep the displayed route and compute nothing
+        return no_update, None, True, ''
+
+    min_population, countries = normalize_subset(min_population, countries)
+    strategy, seed = normalize_strategy(strategy, seed)
+    key = route_key(str_city, min_population, countries, strategy, seed)
+    trip = cached_route(key)
+    if trip is not None:
+        return route_handle(str_city, min_population, countries, len(trip), strategy, seed), None, True, ''
+
+    try:
+        job_id = route_jobs.start(iter_route(str_city, min_population, countries, strategy=strategy, seed=seed),
+                                  on_done=lambda records: route_cache.put(key, records))
+    except JobsBusy as error:
+        return no_update, None, True, f"The server is busy: {error} Retry in a moment."
+    handle = route_handle(str_city, min_population, countries, 0, strategy, seed)
+    return no_update, {"job": job_id, "route": handle}, False, f"Computing the route from {str_city}..."
+
+
+@callback(
+    Output('seed', 'disabled'),
+    Input('strategy', 'value'),
+)
+def toggle_seed(strategy: str | None) -> bool:
+    """Only enable the seed input with the strategy that uses it."""
+    return normalize_strategy(strategy)[1] is None
+
 
 @callback(
-    Output('trip', 'data'),
-    Input('dropdown', 'value')
+    Output('trip', 'data', allow_duplicate=True),
+    Output('route-poll', 'disabled', allow_duplicate=True),
+    Output('route-status', 'children', allow_duplicate=True),
+    Input('route-poll', 'n_intervals'),
+    State('route-job', 'data'),
+    prevent_initial_call=True
 )
-def move_atw(str_city: str) -> list[dict]:
+def poll_route(_: int, job_handle: dict | None) -> tuple:
+    """Point the `trip` store at the part of the route computed so far.
+
+    Once the job is over, the handle of the completed route replaces the job one.
+
+    Returns:
+        tuple: The partial (or complete) trip handle, or no update, whether polling
+        is disabled and the status message.
+    """
+    job_id = job_handle and job_handle["job"]
+    job = route_jobs.get(job_id)
+    if job is None:
+        return no_update, True, ''
+
+    done = job.done
+    stops = job.new_stops()
+    if not done:
+        if stops is None:
+            return no_update, False, no_update
+        city = job_handle["route"]["city"]
+        return {"job": job_id, "stops": stops}, False, f"Computing the route from {city}... {stops} stops"
+
+    if job.error is not None:
+        # keep the job registered so the partial trip stays readable
+        if isinstance(job.error, (BudgetExceeded, NoRouteHome)):
+            # the optimizer could not find a loop: not a failure of the app
+            return {"job": job_id, "stops": len(job.records)}, True, str(job.error)
+        logger.error("Route computation failed from %s.", job_handle["route"]["city"], exc_info=job.error)
+        return {"job": job_id, "stops": len(job.records)}, True, "Route computation failed."
+
+    route_jobs.discard(job_id)
+    return {**job_handle["route"], "stops": len(job.records)}, True, ''
+
+
+
+def compute_route(str_city: str, min_population: float | None = None,
+                  countries: tuple[str, ...] | None = None, tracer: RouteTracer | None = None,
+                  strategy: str = DEFAULT_STRATEGY, seed: int | None = None) -> list[dict]:
+    """Compute the trip around the world starting from `str_city`, bypassing the cache.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Subset threshold, see `subset_index`.
+        countries (tuple[str, ...] | None, optional): Subset countries, see `subset_index`.
+        tracer (RouteTracer | None, optional): Records the steps, see `iter_route`.
+        strategy (str, optional): Routing strategy, see `iter_route`.
+        seed (int | None, optional): Seed of the strategy, see `iter_route`.
+
+    Returns:
+        list[dict]: The visited cities in order.
+    """
+    return list(iter_route(str_city, min_population, countries, tracer, strategy, seed))
+
+
+def iter_route(str_city: str, min_population: float | None = None, countries: tuple[str, ...] | None = None,
+               tracer: RouteTracer | None = None, strategy: str = DEFAULT_STRATEGY,
+               seed: int | None = None) -> Iterator[dict]:
+    """Compute the trip around the world starting from `str_city` one leg at a time.
+
+    The starting city is yielded first, then every city as soon as it is reached,
+    so callers can display the route while it grows or stop early.
+
+    Args:
+        str_city (str): Name of the starting city.
+        min_population (float | None, optional): Subset threshold, see `subset_index`.
+        countries (tuple[str, ...] | None, optional): Subset countries, see `subset_index`.
+        tracer (RouteTracer | None, optional): Records the branch, the search
+            expansions and the time per phase of every step. Defaults to None.
+        strategy (str, optional): Name of the strategy choosing among the eastward
+            candidates, see `strategies.py`. Defaults to the fastest longitudinal speed.
+            With `strategies.OPTIMAL_STRATEGY`, the loop with the smallest total time
+            is searched first (see `optimizer.py`), then yielded.
+        seed (int | None, optional): Seed of the generator handed to the strategy. Defaults to None.
+
+    Yields:
+        dict: The record of each visited city.
+    """
+    city_index = routing_index(str_city, min_population, countries)
+    cities_data = city_index.data
+    # precomputed eastward successors, only built for the whole dataset
+    graph = successor_graph() if min_population is None and countries is None else None
+    if strategy == OPTIMAL_STRATEGY:
+        yield from RouteOptimizer(city_index, str_city, graph, tracer).solve()
+        return
+
+    places = cities_data[ids.PLACE].to_numpy()
+    population = cities_data["Population"].to_numpy()
+    # the strategy choosing among the eastward candidates, with its own seeded generator
+    choose = get_strategy(strategy)
+    rng = np.random.default_rng(ids.RANDOM_SEED if seed is None else seed)
 
     # initialization
     start_point: pd.DataFrame = cities_data[cities_data[ids.PLACE] == str_city]
+    start_long = start_point["Longitude"].iloc[0]
     index = 0
-    current_point = start_point.copy()
+    # the current city as a row of `cities_data` with its travel metrics, and its position
+    current = start_point.iloc[0]
+    position = cities_data.index.get_loc(start_point.index[0])
 
-    # creating a dataframe with visited cities
-    trip = start_point.copy()
-    # Initialize the trip DataFrame with additional numeric columns
-    # to ensure consistent structure when concatenating next cities
-    trip[["Dist_long", "Distance_km", "Time", "Speed"]] = 0.0
+    # collecting the visited cities, starting with zeroed travel metrics
+    trip = TripBuilder(start_point.iloc[0], Dist_long=0.0, Distance_km=0.0, Time=0.0, Speed=0.0,
+                       Dist_from_home=np.nan)
+    yield trip[0]
 
     while True:
 
-        if (start_point["Longitude"].iloc[0] - ids.DELTA_HOME <= current_point["Longitude"].iloc[0] <= start_point["Longitude"].iloc[0])\
-                and index != 0:
-            # Use calc_neighbors_home when is near home
-            neighbors: pd.DataFrame = calc_neighbors_home(current_point, cities_data, start_point, trip, delta=1, verbose=False)
-            # Extract three nearest city
-            near3 = get_top3(neighbors)
-            if near3.shape[0] == 0:
-                return trip.to_dict('records')
-            # calculate travel time
-            near3["Time"] = near3.apply(lambda row: calculate_time(row, current_point["Country"].iloc[0]), axis=1)
-            # Select next city prioritizing movement toward home
-            next_point = create_move(near3, lambda df: go_home(df, str_city))
+        near_home = start_long - ids.DELTA_HOME <= current["Longitude"] <= start_long and index != 0
+        if tracer is not None:
+            tracer.start_step(index, "home" if near_home else "east", current[ids.PLACE])
+
+        candidates = None
+        if graph is not None and not near_home:
+            # rank the eastward candidates from the precomputed successors
+            candidates = graph.candidates(position, trip, places, population)
+            if tracer is not None:
+                tracer.event("graph_step" if candidates is not None else "graph_fallback")
+
+        if candidates is not None:
+            best = choose(candidates, rng)
+            position = candidates.positions[best]
+            next_point = with_metrics(cities_data.iloc[position], Dist_long=candidates.dist_long[best],
+                                      Distance_km=candidates.distance_km[best], Time=candidates.time[best],
+                                      Speed=candidates.speed[best])
+            if tracer is not None:
+                tracer.mark("graph")
         else:
-            # Normal eastward travel
-            neighbors: pd.DataFrame = calculate_neighbors(current_point, cities_data, trip, delta=1, verbose=False)
-            # Extract three nearest city
-            near3 = get_top3(neighbors)
-            # calculate travel time
-            near3["Time"] = near3.apply(lambda row: calculate_time(row, current_point["Country"].iloc[0]), axis=1)
-            # Select next city with fastest_long logic
-            next_point = create_move(near3, fastest_long)
-
-        # convert pd.Series to single-row pd.DataFrame for concatenation with 'trip'
-        next_point = next_point.to_frame().T
+            next_point, position = live_step(current, cities_data, city_index, start_point, trip,
+                                             near_home, str_city, choose, rng, tracer)
+            if next_point is None:
+                # no city within the maximum search range (e.g. in a sparse subset)
+                logger.info("No city left to travel to from %s, stopping.", current[ids.PLACE])
+                if tracer is not None:
+                    tracer.end_step(None)
+                return
+
         # add 'next_point' to trip
-        trip = pd.concat([trip, next_point], ignore_index=True)
+        trip.append(next_point)
+        record = trip[-1]
+        if tracer is not None:
+            tracer.mark("append")
+            tracer.end_step(record[ids.PLACE])
+        yield record
 
-        current_point = next_point.copy()
+        current = next_point
         index += 1
 
         # Stop conditions
-        if current_point[ids.PLACE].iloc[0] == str_city and index > 0:
-            print(f"Returned to {str_city}!")
+        if current[ids.PLACE] == str_city and index > 0:
+            logger.info("Returned to %s!", str_city)
             break
 
         if index > 10000:
-            print("Too many iterations, stopping.")
+            logger.warning("Too many iterations, stopping.")
             break
 
-    return trip.to_dict('records')
+
+def live_step(current: pd.Series, cities_data: pd.DataFrame, city_index: CityIndex, start_point: pd.DataFrame,
+              trip: TripBuilder, near_home: bool, str_city: str, choose: Strategy, rng: np.random.Generator,
+              tracer: RouteTracer | None = None) -> tuple[pd.Series | None, int]:
+    """Choose the next city by searching the neighbors of the current one.
+
+    Args:
+        current (pd.Series): The current city with its travel metrics.
+        cities_data (pd.DataFrame): The cities the route travels through.
+        city_index (CityIndex): Spatial index over `cities_data`.
+        start_point (pd.DataFrame): Single-row DataFrame of the starting city.
+        trip (TripBuilder): The trip built so far.
+        near_home (bool): Whether the route is approaching the starting city.
+        str_city (str): Name of the starting city.
+        choose (Strategy): Strategy choosing among the eastward candidates.
+        rng (np.random.Generator): Generator of the route, handed to the strategy.
+        tracer (RouteTracer | None, optional): Records the search. Defaults to None.
+
+    Returns:
+        tuple[pd.Series | None, int]: The next city with its travel metrics and its
+        position in `cities_data`, or None if no city is within reach.
+    """
+    # single-row DataFrame expected by the neighbor searches
+    current_point = current.to_frame().T
+
+    if near_home:
+        # Use calc_neighbors_home when is near home
+        neighbors: pd.DataFrame = calc_neighbors_home(current_point, cities_data, start_point, trip, delta=1,
+                                                      index=city_index, tracer=tracer)
+    else:
+        # Normal eastward travel
+        neighbors: pd.DataFrame = calculate_neighbors(current_point, cities_data, trip, delta=1,
+                                                      index=city_index, tracer=tracer)
+    if tracer is not None:
+        tracer.mark("search")
+
+    # Score the three nearest cities: travel time and longitudinal speed
+    candidates = rank_candidates(neighbors, current["Country"])
+    if tracer is not None:
+        tracer.mark("rank")
+    if candidates.positions.size == 0:
+        return None, -1
+
+    if near_home:
+        # Select next city prioritizing movement toward home
+        best = homeward_candidate(candidates, str_city)
+    else:
+        # Select the city toward east with the routing strategy
+        best = choose(candidates, rng)
+    next_point = candidate_row(neighbors, candidates, best)
+    if tracer is not None:
+        tracer.mark("move")
+    return next_point, cities_data.index.get_loc(neighbors.index[candidates.positions[best]])
+
 
 def main():
     move_atw("London GB")
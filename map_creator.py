@@ -1,118 +1,198 @@
+import logging
+import time
+
+import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
-from aio import ThemeSwitchAIO
+from dash_bootstrap_templates import ThemeSwitchAIO
 from plotly.graph_objs import Figure
-from dash import html, dcc, Input, Output, Dash
+from dash import html, dcc, Input, Output, State, Dash, Patch, no_update
 
 import ids
+from main import load_trip
 
-# Build origin–destination pairs for each step of the trip
-def create_path(data: pd.DataFrame) -> pd.DataFrame:
-    """
-    Build a DataFrame representing all steps of the trip by pairing each city
-    with the following one in the route.
+logger = logging.getLogger(__name__)
 
-    This function assumes that the input DataFrame contains one row per visited
-    city in chronological order. It shifts the DataFrame by one row to align each
-    city with the next destination, allowing the map to draw line segments
-    between sequential stops. The final row is dropped because it has no next city.
+# Theme-dependent styling of the map
+def theme_style(toggle: bool) -> dict:
+    """
+    Return the colors and map style matching the active UI theme.
 
     Args:
-        data (pd.DataFrame): A DataFrame containing the ordered list of visited cities.
-            It must include at least the columns "Latitude" and "Longitude".
+        toggle (bool): The current theme value from ThemeSwitchAIO (True for light).
 
     Returns:
-        pd.DataFrame: A DataFrame where each row represents one leg of the trip.
-            Columns from the original DataFrame are preserved, and the corresponding
-            "next" city columns are suffixed with "_next".
+        dict: The route line color, the stops color, the start city color and the map style.
     """
-    # Align each row with the next city
-    df_path = data.join(
-        data.shift(-1),  # map each stop to its next stop
-        rsuffix='_next'
-    ).dropna(subset=['Latitude_next']) # Remove last row (no next city)
+    return {
+        "line_color": 'rgb(0, 92, 175)' if toggle else 'rgb(0, 180, 255)',
+        "points_color": 'rgb(255, 140, 0)' if toggle else 'rgb(255, 215, 0)',
+        "first_color": 'rgb(46, 164, 79)' if toggle else 'rgb(0, 255, 155)',
+        "map_style": 'carto-positron' if toggle else 'carto-darkmatter',
+    }
+
+# Colors of the routes compared with the main one, whatever the theme
+COMPARE_COLORS = ['rgb(214, 39, 40)', 'rgb(148, 103, 189)', 'rgb(23, 190, 207)', 'rgb(227, 119, 194)']
+
+# Build the coordinates of the whole route as NaN-separated arrays
+def route_coordinates(data: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the coordinate arrays drawing the whole trip as a single polyline.
+
+    Consecutive stops are joined by one continuous line. When a leg crosses the
+    180° meridian, its end point is shifted by ±360° so the segment is drawn the
+    short way round, and the line is broken with a NaN gap before resuming at the
+    real position of that city. Hover text is kept for every point.
 
-    return df_path
+    Args:
+        data (pd.DataFrame): A DataFrame containing the ordered list of visited cities.
+            It must include at least the columns "Latitude", "Longitude" and `ids.PLACE`.
 
-def get_map(trip: list[dict], toggle: bool) -> Figure:
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Longitudes, latitudes and hover
+        texts, NaN (None for texts) where the line is interrupted.
+    """
+    lon = data['Longitude'].to_numpy(dtype=float)
+    lat = data['Latitude'].to_numpy(dtype=float)
+    text = data[ids.PLACE].to_numpy(dtype=object)
+
+    # legs crossing the 180° meridian, identified by the index of their end point
+    ends = np.flatnonzero(np.abs(np.diff(lon)) > 180) + 1
+    if ends.size == 0:
+        return lon, lat, text
+
+    # after each crossing leg, insert its shifted end point followed by a gap
+    shifted = lon[ends] + 360 * np.sign(lon[ends - 1] - lon[ends])
+    positions = np.repeat(ends, 2)
+    lon = np.insert(lon, positions, np.column_stack([shifted, np.full(ends.size, np.nan)]).ravel())
+    lat = np.insert(lat, positions, np.column_stack([lat[ends], np.full(ends.size, np.nan)]).ravel())
+    text = np.insert(text, positions, np.column_stack([text[ends], np.full(ends.size, None)]).ravel())
+    return lon, lat, text
+
+def get_map(trip: pd.DataFrame, toggle: bool, compared: list[pd.DataFrame] | None = None) -> Figure:
     """
     Generate the Plotly map displaying the trip route and visited cities.
 
-    This function converts the trip information into a DataFrame, constructs the
-    path using consecutive origin–destination pairs, and draws both the route lines
-    and city markers. Line and marker colors are selected dynamically based on the
-    active UI theme, allowing the visualization to remain readable in both light
-    and dark modes.
+    This function draws the whole route, lines and city markers, as a single trace built by
+    `route_coordinates`, plus one trace highlighting the starting city. Line and
+    marker colors are selected dynamically based on the active UI theme, allowing
+    the visualization to remain readable in both light and dark modes.
+    Compared trips are drawn after these two traces, one trace each in the colors
+    of `COMPARE_COLORS`, with a legend naming their starting city.
 
     Args:
-        trip (list[dict]): A list of dictionaries where each dictionary represents
-            a visited city and must include "Latitude", "Longitude", and identifying
-            fields such as name or country.
+        trip (pd.DataFrame): The trip, one row per visited city. It must include
+            "Latitude", "Longitude" and `ids.PLACE`.
         toggle (bool): The current theme value from ThemeSwitchAIO.
+        compared (list[pd.DataFrame] | None, optional): Other trips drawn on the same
+            map. Defaults to None.
 
     Returns:
-        go.Figure: A Plotly Geo figure containing the full visualization of the route,
-        including all line segments and city markers.
+        go.Figure: A Plotly figure containing the full visualization of the route,
+        including the route trace and the starting city marker.
     """
-    # Convert trip data to DataFrame and build path segments
-    trip_path = create_path(pd.DataFrame.from_records(trip))
+    # Build the route coordinates
+    lon, lat, text = route_coordinates(trip)
 
     # Select colors based on theme
-    line_color = 'rgb(0, 92, 175)' if toggle else 'rgb(0, 180, 255)'
-    points_color = 'rgb(255, 140, 0)' if toggle else 'rgb(255, 215, 0)'
-    first_color = 'rgb(46, 164, 79)' if toggle else 'rgb(0, 255, 155)'
-
-    # Initialize empty figure
-    fig = go.Figure(go.Scattermap())
-
-    for i in range(len(trip_path)):
-        lon1 = trip_path['Longitude'][i]
-        lon2 = trip_path['Longitude_next'][i]
-
-        # Adjust for 180° longitude wrap
-        if abs(lon1 - lon2) > 180:
-            lon2 += 360
-
-        # Add line segment and markers
-        fig.add_trace(
-            go.Scattermap(
-                lon=[lon1, lon2],
-                lat=[trip_path['Latitude'][i], trip_path['Latitude_next'][i],],
-                mode='markers+lines',
-                hoverinfo='text',
-                text=trip_path[ids.PLACE][i],
-                line=dict(width = 1.5, color = line_color),
-                marker=dict(size = 5, color = points_color),
-            )
-        )
-
-    # Start city marker
-    fig.add_trace(go.Scattermap(
-        lon = [trip_path['Longitude'].iloc[0]],
-        lat = [trip_path['Latitude'].iloc[0]],
-        text = trip_path[ids.PLACE].iloc[0],
-        hoverinfo='text',
-        marker = dict(
-            size = 10,
-            color = first_color,
-        )))
-
-    map_style = 'carto-positron' if toggle else 'carto-darkmatter'
+    style = theme_style(toggle)
+
+    fig = go.Figure([
+        # Whole route: line segments and markers
+        go.Scattermap(
+            lon=lon,
+            lat=lat,
+            mode='markers+lines',
+            hoverinfo='text',
+            text=text,
+            name=text[0] if len(text) else None,
+            line=dict(width = 1.5, color = style['line_color']),
+            marker=dict(size = 5, color = style['points_color']),
+        ),
+        # Start city marker
+        go.Scattermap(
+            lon = lon[:1],
+            lat = lat[:1],
+            text = text[:1],
+            hoverinfo='text',
+            showlegend=False,
+            marker = dict(
+                size = 10,
+                color = style['first_color'],
+            )),
+    ])
+
+    for i, other in enumerate(compared or []):
+        other_lon, other_lat, other_text = route_coordinates(other)
+        fig.add_trace(go.Scattermap(
+            lon=other_lon,
+            lat=other_lat,
+            mode='markers+lines',
+            hoverinfo='text',
+            text=other_text,
+            name=other_text[0],
+            line=dict(width=1.5, color=COMPARE_COLORS[i % len(COMPARE_COLORS)]),
+            marker=dict(size=4, color=COMPARE_COLORS[i % len(COMPARE_COLORS)]),
+        ))
 
     fig.update_layout(
-        showlegend=False,
+        showlegend=bool(compared),
         margin=dict(l=0, r=0, t=0, b=0),
-        map_style=map_style
+        map_style=style['map_style']
     )
 
     return fig
 
+def theme_patch(toggle: bool) -> Patch:
+    """
+    Build a partial update restyling a figure made by `get_map` for another theme.
+
+    Only the map style and the trace colors are sent to the browser, so switching
+    theme costs the same whatever the length of the trip.
+
+    Args:
+        toggle (bool): The new theme value from ThemeSwitchAIO.
+
+    Returns:
+        Patch: The partial figure update.
+    """
+    style = theme_style(toggle)
+    patch = Patch()
+    patch['layout']['map']['style'] = style['map_style']
+    patch['data'][0]['line']['color'] = style['line_color']
+    patch['data'][0]['marker']['color'] = style['points_color']
+    patch['data'][1]['marker']['color'] = style['first_color']
+    return patch
+
+def map_report(trip: pd.DataFrame, toggle: bool = True) -> dict:
+    """
+    Measure the cost of building the map of a trip.
+
+    Args:
+        trip (pd.DataFrame): The trip, as passed to `get_map`.
+        toggle (bool, optional): The theme value. Defaults to True.
+
+    Returns:
+        dict: Number of legs and traces, server build time in seconds and size in
+        bytes of the JSON figure sent to the browser.
+    """
+    start = time.perf_counter()
+    fig = get_map(trip, toggle)
+    build_seconds = time.perf_counter() - start
+
+    return {
+        "legs": max(len(trip) - 1, 0),
+        "traces": len(fig.data),
+        "build_seconds": round(build_seconds, 4),
+        "payload_bytes": len(fig.to_json()),
+    }
+
 def render(app: Dash) -> html.Div:
     """
     Register the map callback and return the container element for the map panel.
 
     This function attaches the callback responsible for generating the map figure
-    based on the current trip and theme. It returns the container wrapping the
+    based on the current trip and the compared ones (see `compare.render`), and the one restyling it when the theme changes. It returns the container wrapping the
     Dash Graph component, so it can be included in the application's layout.
 
     Args:
@@ -122,14 +202,30 @@ def render(app: Dash) -> html.Div:
         html.Div: A Div container holding the Graph component that displays the route map.
         """
 
-    # Update map when trip or theme changes
+    # Rebuild map when the trip changes
     @app.callback(
         Output('map-graph', 'figure'),
         Input('trip', 'data'),
-        Input(ThemeSwitchAIO.ids.switch('theme-switch'), 'value')
+        Input('compare-trips', 'data'),
+        State(ThemeSwitchAIO.ids.switch('theme-switch'), 'value')
+    )
+    def update_map(handle: dict, compared_handles: list[dict] | None, toggle: bool) -> Figure:
+        trip = load_trip(handle)
+        if trip is None:
+            return no_update
+        compared = [t for t in map(load_trip, compared_handles or []) if t is not None]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("map of %s", map_report(trip, toggle))
+        return get_map(trip, toggle, compared)
+
+    # Only restyle the existing map when the theme changes
+    @app.callback(
+        Output('map-graph', 'figure', allow_duplicate=True),
+        Input(ThemeSwitchAIO.ids.switch('theme-switch'), 'value'),
+        prevent_initial_call=True
     )
-    def update_map(trip: list[dict], toggle: bool) -> Figure:
-        return get_map(trip, toggle)
+    def update_theme(toggle: bool) -> Patch:
+        return theme_patch(toggle)
 
     return html.Div(
         className='map-container',
@@ -137,7 +233,7 @@ def render(app: Dash) -> html.Div:
             dcc.Graph(
                 className="map-class",
                 id='map-graph',
-                # Render map container
-                figure = {},
+                # Empty map until the first trip is loaded, styled so the theme switch can patch it
+                figure = get_map(pd.DataFrame(columns=['Longitude', 'Latitude', ids.PLACE]), True),
                 )]
         )
\ No newline at end of file
@@ -0,0 +1,343 @@
+"""
+optimizer.py
+------------
+
+Minimum-time loop around the world, instead of greedy hops.
+
+`main.iter_route` commits to one of the 3 candidates of every step and never
+revisits a choice. `RouteOptimizer` searches all the loops the same moves can
+form and returns the one with the smallest total "Time", with the time rules of
+`utils.travel_times` (2, 4 or 8 by rank, +2 abroad, +2 for a large city):
+
+- on the way east, the candidates of a city are the 3 nearest of the first
+  window of `calculate_neighbors` holding 3 cities;
+- once in the home zone (`ids.DELTA_HOME` degrees west of the start), they are
+  the 3 nearest cities of `calc_neighbors_home`: any city of the zone on the
+  step entering it, then only the cities closer to the start.
+
+Candidates are ranked as if no city had been visited yet, so the time of a
+move does not depend on the path leading to it. Replayed with the visited cities
+skipped, a few moves of a loop can rank differently, within a fraction of a
+percent of its total time.
+
+Eastward moves always increase the longitude travelled since the start, and
+homeward moves after the first one always reduce the distance to the start. The
+moves therefore form an acyclic graph, ordered by longitude band then by distance
+to home, whose shortest path is found in one pass over the cities. Memory is linear in the
+number of cities, whatever the number of loops. The search stops with
+`BudgetExceeded` when it exceeds its time budget, and raises `NoRouteHome` when
+no loop leads back to the start.
+
+Usage:
+    python optimizer.py "London GB"                         # cities above ids.LARGE_CITY
+    python optimizer.py "London GB" --min-population 0 --budget 60
+"""
+import argparse
+import sys
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+import ids
+from successor_graph import SEARCH_DELTAS
+from trip import TripBuilder
+from utils import Candidates, delta_longitude, distances_from, nearest_positions, travel_times, with_metrics
+
+if TYPE_CHECKING:
+    from spatial_index import CityIndex
+    from successor_graph import SuccessorGraph
+    from tracing import RouteTracer
+
+# cities relaxed between two checks of the time budget
+_BUDGET_CHECK = 256
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when the search exceeds its time budget; nothing keeps running, so
+    retrying with the same budget fails the same way."""
+
+
+class NoRouteHome(RuntimeError):
+    """Raised when no loop of the candidate moves leads back to the starting city."""
+
+
+class RouteGap(NamedTuple):
+    """How far the greedy route is from the optimal one, see `route_gap`."""
+    greedy_time: float
+    optimal_time: float
+    greedy_stops: int
+    optimal_stops: int
+    gap: float  # relative extra time of the greedy route (0.25 = 25% slower)
+    greedy_returned: bool  # whether the greedy route made it back to the start
+
+
+class RouteOptimizer:
+    """Shortest loop around the world from one city, over the candidate moves of the routing rules."""
+
+    def __init__(self, index: "CityIndex", str_city: str, graph: "SuccessorGraph | None" = None,
+                 tracer: "RouteTracer | None" = None):
+        """
+        Args:
+            index (CityIndex): Index over the cities the route travels through.
+            str_city (str): Name of the starting city.
+            graph (SuccessorGraph | None, optional): Precomputed successors of the rows of
+                `index`, reading the eastward candidates without searching. Defaults to None.
+            tracer (RouteTracer | None, optional): Records one step per city relaxed by
+                `solve`, with its search windows and the time of each phase. Defaults to None.
+
+        Raises:
+            ValueError: If `str_city` is not in `index`.
+        """
+        self.index = index
+        self.str_city = str_city
+        self.graph = graph
+        self.tracer = tracer
+
+        data = index.data
+        self.places = data[ids.PLACE].to_numpy()
+        self.population = data["Population"].to_numpy()
+        self.country = data["Country"].to_numpy()
+        matches = np.flatnonzero(self.places == str_city)
+        if not matches.size:
+            raise ValueError(f"Unknown city: {str_city!r}.")
+        self.home = int(matches[0])
+
+        home_lat, home_long = index.latitude[self.home], index.longitude[self.home]
+        self.home_long = home_long
+        # longitude travelled east from the start, in [0, 360)
+        self.offset = (index.longitude - home_long) % 360
+        # same bounds as the `near_home` test of `main.iter_route`
+        self.zone = (index.longitude >= home_long - ids.DELTA_HOME) & (index.longitude <= home_long)
+        self.dist_from_home = distances_from(home_lat, home_long, index.latitude, index.longitude)
+        # an empty trip, to read the successor lists with nothing visited
+        self._unvisited = TripBuilder(data.iloc[self.home])
+
+    def _rank(self, position: int, rows: np.ndarray, dist_long: np.ndarray, distance: np.ndarray,
+              dist_from_home: np.ndarray | None = None) -> Candidates:
+        """Score the 3 nearest of `rows` as candidates of the city at `position`."""
+        top = nearest_positions(distance)
+        rows = rows[top]
+        foreign = self.country[rows] != self.country[position]
+        time = travel_times(self.population[rows], foreign)
+        return Candidates(
+            positions=rows,
+            place=self.places[rows],
+            population=self.population[rows],
+            foreign=foreign,
+            distance_km=distance[top],
+            dist_long=dist_long[top],
+            time=time,
+            speed=dist_long[top] / time,
+            dist_from_home=None if dist_from_home is None else dist_from_home[top],
+        )
+
+    def eastward(self, position: int) -> Candidates | None:
+        """Candidates of an eastward step from the city at `position`, or None at a dead end."""
+        if self.graph is not None:
+            candidates = self.graph.candidates(position, self._unvisited, self.places, self.population)
+            if self.tracer is not None:
+                self.tracer.event("graph_step" if candidates is not None else "graph_fallback")
+            if candidates is not None:
+                return candidates
+
+        index = self.index
+        lat, lon = index.latitude[position], index.longitude[position]
+        for delta in SEARCH_DELTAS:
+            rows, dist_long = index.east_window(lon, lat, delta)
+            distance = distances_from(lat, lon, index.latitude[rows], index.longitude[rows])
+            keep = distance != 0
+            if self.tracer is not None:
+                self.tracer.expansion(delta, rows.size, int(keep.sum()))
+            if keep.sum() >= 3:
+                return self._rank(position, rows[keep], np.abs(dist_long[keep]), distance[keep])
+        if self.tracer is not None:
+            self.tracer.event("no_neighbors")
+        return None
+
+    def homeward(self, position: int, closer: bool = True) -> Candidates | None:
+        """Candidates of a step in the home zone from the city at `position`, or None if there are none.
+
+        Like `calc_neighbors_home`, only the cities closer to the start are kept once
+        in the zone (`closer`), but not on the step arriving from the east, whose city
+        carries no distance to the start.
+        """
+        index = self.index
+        lat, lon = index.latitude[position], index.longitude[position]
+        delta = 1
+        while delta <= 180:
+            rows = index.box(self.home_long - ids.DELTA_HOME, self.home_long, lat - delta, lat + delta)
+            distance = distances_from(lat, lon, index.latitude[rows], index.longitude[rows])
+            keep = distance != 0
+            if closer:
+                keep &= self.dist_from_home[rows] < self.dist_from_home[position]
+            if self.tracer is not None:
+                self.tracer.expansion(delta, rows.size, int(keep.sum()))
+            if keep.any():
+                rows = rows[keep]
+                dist_long = np.abs(delta_longitude(index.longitude[rows], lon))
+                return self._rank(position, rows, dist_long, distance[keep], self.dist_from_home[rows])
+            delta *= 2
+        if self.tracer is not None:
+            self.tracer.event("no_neighbors")
+        return None
+
+    def solve(self, budget_s: float = ids.OPTIMIZER_BUDGET_S) -> list[dict]:
+        """Find the loop with the smallest total time.
+
+        Nodes are the cities on the way east (rows 0..n-1), the cities of the home
+        zone reached from the east (rows n..2n-1), the cities of the home zone reached
+        from inside it (rows 2n..3n-1) and the return to the start (3n). Each one is
+        relaxed once, in the order of the moves: eastward cities by longitude
+        travelled, then the cities entering the home zone, then the home zone by
+        decreasing distance to the start.
+
+        Args:
+            budget_s (float, optional): Seconds the search may take. Defaults to `ids.OPTIMIZER_BUDGET_S`.
+
+        Raises:
+            BudgetExceeded: If the search exceeds `budget_s`.
+            NoRouteHome: If no loop leads back to the starting city.
+
+        Returns:
+            list[dict]: The visited cities in order, with the travel metrics of `main.iter_route`.
+        """
+        deadline = time.perf_counter() + budget_s
+        n = len(self.index)
+        goal = 3 * n
+        cost = np.full(3 * n + 1, np.inf)
+        parent = np.full(3 * n + 1, -1, dtype=np.int64)
+        # metrics of the best move reaching each node: Dist_long, Distance_km, Time
+        legs = np.zeros((3 * n + 1, 3))
+        cost[self.home] = 0.0
+
+        def relax(source: int, node: int, candidates: Candidates, i: int) -> None:
+            total = cost[source] + candidates.time[i]
+            if total < cost[node]:
+                cost[node] = total
+                parent[node] = source
+                legs[node] = candidates.dist_long[i], candidates.distance_km[i], candidates.time[i]
+
+        east = np.flatnonzero(~self.zone)
+        east = np.concatenate([[self.home], east[np.argsort(self.offset[east], kind="stable")]])
+        home_zone = np.flatnonzero(self.zone)
+        home_zone = home_zone[np.argsort(-self.dist_from_home[home_zone], kind="stable")]
+
+        for k, u in enumerate(np.concatenate([east, n + home_zone, 2 * n + home_zone])):
+            if k % _BUDGET_CHECK == 0 and time.perf_counter() > deadline:
+                raise BudgetExceeded(f"The optimal route from {self.str_city} needs more than the "
+                                     f"{budget_s:g}s budget of the optimizer.")
+            if cost[u] == np.inf:
+                continue
+            position = u % n
+            if self.tracer is not None:
+                self.tracer.start_step(k, "optimize_home" if u >= n else "optimize_east", self.places[position])
+            candidates = self.homeward(position, closer=u >= 2 * n) if u >= n else self.eastward(position)
+            if self.tracer is not None:
+                self.tracer.mark("search")
+            if candidates is None:
+                if self.tracer is not None:
+                    self.tracer.end_step(None)
+                continue
+            for i, v in enumerate(candidates.positions):
+                if self.places[v] == self.str_city:
+                    relax(u, goal, candidates, i)
+                elif u >= n:
+                    relax(u, 2 * n + v, candidates, i)
+                elif self.zone[v]:
+                    relax(u, n + v, candidates, i)
+                elif self.offset[v] > self.offset[position]:
+                    # eastward moves passing the start longitude would start a second lap
+                    relax(u, v, candidates, i)
+            if self.tracer is not None:
+                self.tracer.mark("relax")
+                # no city is reached yet: the route is only known once every city is relaxed
+                self.tracer.end_step(None)
+
+        if cost[goal] == np.inf:
+            raise NoRouteHome(f"No route around the world leads back to {self.str_city}.")
+        return self._trip(parent, legs, goal)
+
+    def _trip(self, parent: np.ndarray, legs: np.ndarray, goal: int) -> list[dict]:
+        """Rebuild the trip reaching `goal` from the parents of the search."""
+        n = len(self.index)
+        path = [goal]
+        while path[-1] != self.home:
+            path.append(int(parent[path[-1]]))
+
+        data = self.index.data
+        trip = TripBuilder(data.iloc[self.home], Dist_long=0.0, Distance_km=0.0, Time=0.0, Speed=0.0,
+                           Dist_from_home=np.nan)
+        for source, node in zip(path[::-1], path[-2::-1]):
+            position = self.home if node == goal else node % n
+            dist_long, distance, travel_time = legs[node]
+            metrics = {"Dist_long": dist_long, "Distance_km": distance}
+            if source >= n:
+                # steps from the home zone carry their distance to the start, as `calc_neighbors_home` does
+                metrics["Dist_from_home"] = self.dist_from_home[position]
+            trip.append(with_metrics(data.iloc[position], **metrics, Time=travel_time,
+                                     Speed=dist_long / travel_time))
+        return trip.to_records()
+
+
+def route_gap(greedy: list[dict], optimal: list[dict]) -> RouteGap:
+    """Compare a greedy route with the optimal one from the same city.
+
+    Args:
+        greedy (list[dict]): Route of `main.move_atw`.
+        optimal (list[dict]): Route of `RouteOptimizer.solve`.
+
+    Returns:
+        RouteGap: Total times, stops and the relative extra time of the greedy route.
+    """
+    greedy_time = float(sum(record["Time"] for record in greedy))
+    optimal_time = float(sum(record["Time"] for record in optimal))
+    return RouteGap(
+        greedy_time=greedy_time,
+        optimal_time=optimal_time,
+        greedy_stops=len(greedy) - 1,
+        optimal_stops=len(optimal) - 1,
+        gap=greedy_time / optimal_time - 1,
+        greedy_returned=greedy[-1][ids.PLACE] == greedy[0][ids.PLACE],
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the greedy route from a city with the optimal one.")
+    parser.add_argument("city", help="starting city, e.g. 'London GB'")
+    parser.add_argument("--min-population", type=float, default=ids.LARGE_CITY,
+                        help="only travel through cities at least this populated (0 for all)")
+    parser.add_argument("--countries", nargs="+", help="only travel through cities of these country codes")
+    parser.add_argument("--budget", type=float, default=ids.OPTIMIZER_BUDGET_S, help="time budget in seconds")
+    args = parser.parse_args(argv)
+
+    # imported here so the optimizer itself does not load the routing data
+    import main as routing
+
+    min_population, countries = routing.normalize_subset(args.min_population, args.countries)
+    start = time.perf_counter()
+    try:
+        greedy = routing.compute_route(args.city, min_population, countries)
+    except ValueError as error:
+        sys.exit(str(error))
+    greedy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph = routing.successor_graph() if min_population is None and countries is None else None
+    try:
+        optimizer = RouteOptimizer(routing.routing_index(args.city, min_population, countries), args.city, graph)
+        optimal = optimizer.solve(args.budget)
+    except (ValueError, BudgetExceeded, NoRouteHome) as error:
+        sys.exit(str(error))
+    optimal_s = time.perf_counter() - start
+
+    gap = route_gap(greedy, optimal)
+    print(f"{'route':<10}{'stops':>7}{'time':>10}{'seconds':>10}")
+    print(f"{'greedy':<10}{gap.greedy_stops:>7}{gap.greedy_time:>10.0f}{greedy_s:>10.2f}"
+          + ("" if gap.greedy_returned else "  (did not return)"))
+    print(f"{'optimal':<10}{gap.optimal_stops:>7}{gap.optimal_time:>10.0f}{optimal_s:>10.2f}")
+    print(f"The greedy route takes {gap.gap:.1%} more time than the optimal one.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from functools import cache
+
+import numpy as np
+import pandas as pd
+from dash import Dash, Input, Output, State, no_update
+from flask import jsonify, request
+
+import ids
+from import_data import loader
+
+# characters starting a new word inside a place name
+WORD_BREAK = re.compile(r"[ \-'(/]")
+# default and maximum number of matches returned by a search
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def normalize_name(name: str) -> str:
+    """Fold a place name for matching: accents are stripped and case is ignored.
+
+    Args:
+        name (str): The name as typed or as stored in the dataset.
+
+    Returns:
+        str: The folded name.
+    """
+    if not name.isascii():
+        name = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+    return name.casefold()
+
+
+class PlaceIndex:
+    """Prefix index over the place names, ranked by population.
+
+    Every word of every city name is indexed, so a query matches the cities with a
+    word starting with it ("york" finds "New York US"); the country code ending each
+    name is only matched after the city name. Matching ignores accents and case.
+    The index is a sorted list of folded name suffixes, each starting at a word,
+    searched with two binary searches per query.
+    """
+
+    def __init__(self, names: pd.Series, population: pd.Series):
+        """
+        Args:
+            names (pd.Series): The place names (`ids.PLACE` values).
+            population (pd.Series): Population of each place, aligned with `names`.
+        """
+        self.names = names.to_numpy(dtype=object)
+        self.population = population.to_numpy(dtype=float)
+
+        keys, rows = [], []
+        for row, name in enumerate(self.names):
+            key = normalize_name(name)
+            keys.append(key)
+            rows.append(row)
+            # later words of the city name, up to the country code
+            for match in WORD_BREAK.finditer(key, 0, key.rfind(' ')):
+                keys.append(key[match.end():])
+                rows.append(row)
+
+        # Python's sort is much faster than NumPy's on object arrays of strings
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._rows = np.array(rows, dtype=np.int64)[order]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list[str]:
+        """Return the most populated places with a word starting with `query`.
+
+        Args:
+            query (str): The typed text; accents and case are ignored.
+            limit (int, optional): Maximum number of matches. Defaults to `SEARCH_LIMIT`.
+
+        Returns:
+            list[str]: Matching place names, most populated first.
+        """
+        prefix = normalize_name(query.strip())
+        if not prefix or limit <= 0:
+            return []
+
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + '\U0010ffff', lo)
+        rows = np.unique(self._rows[lo:hi])
+        if rows.size > limit:
+            # keep the `limit` most populated matches before sorting them
+            rows = rows[np.argpartition(-self.population[rows], limit - 1)[:limit]]
+        rows = rows[np.lexsort((self.names[rows], -self.population[rows]))]
+        return self.names[rows].tolist()
+
+
+_index_lock = threading.Lock()
+
+
+@cache
+def _build_place_index() -> PlaceIndex:
+    data = loader.routing_data()
+    return PlaceIndex(data[ids.PLACE], data['Population'])
+
+
+def place_index() -> PlaceIndex:
+    """Search index over the cities of the routing dataset, built once on first use."""
+    with _index_lock:
+        return _build_place_index()
+
+
+def render(app: Dash, dropdown_id: str) -> None:
+    """
+    Serve the options of a city dropdown from the search index.
+
+    The dropdown starts with no options but its value; as the user types, the
+    callback replaces them with the best matches. Multi-select dropdowns keep
+    every selected city among the options. The same search is exposed as
+    JSON at `/api/search?q=<text>&limit=<n>`. The index is built in a background
+    thread right away, so it is usually ready by the first keystroke.
+
+    Args:
+        app (Dash): The Dash application instance used to register callbacks.
+        dropdown_id (str): Id of the dropdown searching the cities.
+    """
+
+    @app.callback(
+        Output(dropdown_id, 'options'),
+        Input(dropdown_id, 'search_value'),
+        State(dropdown_id, 'value')
+    )
+    def update_options(search_value: str | None, value: str | list[str] | None) -> list[str]:
+        if not search_value:
+            return no_update
+        matches = place_index().search(search_value)
+        # keep the selected cities among the options, or the dropdown would clear them
+        selected = value if isinstance(value, list) else [value] if value else []
+        matches.extend(city for city in selected if city not in matches)
+        return matches
+
+    if 'search_places' in app.server.view_functions:
+        # the endpoint and the index are shared by every dropdown
+        return
+
+    @app.server.route('/api/search')
+    def search_places():
+        limit = min(request.args.get('limit', SEARCH_LIMIT, type=int), MAX_SEARCH_LIMIT)
+        return jsonify(place_index().search(request.args.get('q', ''), limit))
+
+    threading.Thread(target=place_index, daemon=True).start()
@@ -0,0 +1,119 @@
+"""
+precompute.py
+-------------
+
+Batch precomputation of the routes around the world.
+
+Start cities are fanned out across a pool of worker processes. The pool is
+forked after the cities dataset and its spatial index are loaded, so every
+worker reads the parent's arrays through shared copy-on-write memory instead
+of receiving a pickled copy of `cities_data`. Each worker streams its routes
+into its own shard of the `RouteStore`, which `main.move_atw` then serves from.
+Cities already in the store are skipped, so an interrupted run can be resumed
+by launching it again.
+
+Usage:
+    python precompute.py --workers 8 --min-population 200000 --countries GB FR
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+import ids
+import main as routing
+from route_store import ShardWriter
+
+# shard writer of the current worker process, opened by `_init_worker`
+_writer: ShardWriter | None = None
+
+
+def _init_worker() -> None:
+    global _writer
+    _writer = routing.route_store().writer(f"worker-{os.getpid()}")
+
+
+def _route_worker(city: str) -> tuple[int, float]:
+    """Compute and store one route; return the worker pid and the time spent."""
+    start = time.perf_counter()
+    _writer.append(city, routing.compute_route(city))
+    return os.getpid(), time.perf_counter() - start
+
+
+def select_cities(data: pd.DataFrame, countries: list[str] | None = None,
+                  min_population: float | None = None) -> list[str]:
+    """Select the start cities to precompute.
+
+    Args:
+        data (pd.DataFrame): The cities dataset.
+        countries (list[str] | None, optional): Alpha-2 country codes to keep
+            (case-insensitive). Defaults to None, keeping every country.
+        min_population (float | None, optional): Minimum population to keep.
+            Defaults to None, keeping every city.
+
+    Returns:
+        list[str]: The selected cities, most populated first.
+    """
+    mask = pd.Series(True, index=data.index)
+    if countries:
+        mask &= data["Country"].str.upper().isin([c.upper() for c in countries])
+    if min_population is not None:
+        mask &= data["Population"] >= min_population
+    return list(data.loc[mask].sort_values("Population", ascending=False)[ids.PLACE])
+
+
+def run(cities: list[str], workers: int, report_every: float = 10.0) -> None:
+    """Compute the routes of `cities` on a process pool, reporting progress periodically.
+
+    Args:
+        cities (list[str]): Start cities whose route is not stored yet.
+        workers (int): Number of worker processes.
+        report_every (float, optional): Seconds between progress reports. Defaults to 10.
+    """
+    done = 0
+    counts: dict[int, int] = defaultdict(int)
+    busy: dict[int, float] = defaultdict(float)
+    started = last_report = time.perf_counter()
+
+    with mp.get_context("fork").Pool(workers, initializer=_init_worker) as pool:
+        for pid, elapsed in pool.imap_unordered(_route_worker, cities, chunksize=4):
+            done += 1
+            counts[pid] += 1
+            busy[pid] += elapsed
+
+            now = time.perf_counter()
+            if now - last_report >= report_every or done == len(cities):
+                last_report = now
+                print(f"[{done}/{len(cities)}] {done / (now - started):.2f} routes/s overall")
+                for worker in sorted(counts):
+                    print(f"    worker {worker}: {counts[worker]} routes, "
+                          f"{counts[worker] / busy[worker]:.2f} routes/s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute routes around the world for many start cities.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--countries", nargs="+", help="only start from cities of these Alpha-2 country codes")
+    parser.add_argument("--min-population", type=float, help="only start from cities at least this populated")
+    parser.add_argument("--limit", type=int, help="stop after this many new routes")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    # loading the data and index here, before the pool forks, shares them with the workers
+    store = routing.route_store()
+    completed = store.completed()
+    cities = [c for c in select_cities(routing.cities_index().data, args.countries, args.min_population)
+              if c not in completed]
+    if args.limit is not None:
+        cities = cities[:args.limit]
+
+    print(f"{len(completed)} routes already stored in {store.directory}, {len(cities)} to compute")
+    if cities:
+        run(cities, args.workers, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import pandas as pd
+
+import ids
+
+
+class RouteKey(NamedTuple):
+    """Identify a route by everything its computation depends on."""
+    fingerprint: str  # fingerprint of the cities dataset, see `dataset_fingerprint`
+    city: str  # starting city (`ids.PLACE` value)
+    params: tuple[tuple[str, object], ...]  # algorithm parameters as sorted (name, value) pairs
+
+    def digest(self) -> str:
+        """Return a stable file-name-safe hash of the city and parameters."""
+        payload = json.dumps([self.city, list(self.params)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dataset_fingerprint(data: pd.DataFrame) -> str:
+    """Compute a fingerprint of the columns that routing depends on.
+
+    Args:
+        data (pd.DataFrame): The cities dataset used for routing.
+
+    Returns:
+        str: A hexadecimal digest that changes whenever the routing columns change.
+    """
+    columns = [ids.PLACE, "Latitude", "Longitude", "Population", "Country"]
+    hashes = pd.util.hash_pandas_object(data[columns], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()[:32]
+
+
+class RouteCache:
+    """Two-tier cache of computed routes.
+
+    Routes are kept in a bounded in-memory LRU and, when `directory` is set, also
+    pickled to disk under one sub-directory per dataset fingerprint. The disk tier
+    survives restarts and is shared by every process pointing at the same
+    directory; files are written atomically, so concurrent workers never read a
+    partial route.
+    """
+
+    def __init__(self, directory: str | None = ids.ROUTE_CACHE_DIR, max_entries: int = ids.ROUTE_CACHE_SIZE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory: OrderedDict[RouteKey, list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: RouteKey) -> str:
+        return os.path.join(self.directory, key.fingerprint, key.digest() + ".pkl")
+
+    def _remember(self, key: RouteKey, route: list[dict]) -> None:
+        """Insert or refresh an entry in the memory tier, evicting the least recently used."""
+        with self._lock:
+            self._memory[key] = route
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: RouteKey) -> list[dict] | None:
+        """Return the cached route for `key`, or None if neither tier holds it.
+
+        Args:
+            key (RouteKey): The route identifier.
+
+        Returns:
+            list[dict] | None: The route records, or None on a cache miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                route = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        self._remember(key, route)
+        return route
+
+    def put(self, key: RouteKey, route: list[dict]) -> None:
+        """Store a route in both tiers.
+
+        Args:
+            key (RouteKey): The route identifier.
+            route (list[dict]): The route records.
+        """
+        self._remember(key, route)
+        if self.directory is None:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so readers never see a partial route
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(route, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, key: RouteKey) -> None:
+        """Drop a single route from both tiers.
+
+        Args:
+            key (RouteKey): The route identifier.
+        """
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.directory is not None:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate_dataset(self, keep: str | None = None) -> None:
+        """Drop every route computed on another dataset than `keep`.
+
+        Call it when the cities data changes; with `keep=None` the whole cache is cleared.
+
+        Args:
+            keep (str | None, optional): Fingerprint whose routes are preserved. Defaults to None.
+        """
+        with self._lock:
+            for key in [k for k in self._memory if k.fingerprint != keep]:
+                del self._memory[key]
+
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        for fingerprint in os.listdir(self.directory):
+            if fingerprint != keep:
+                shutil.rmtree(os.path.join(self.directory, fingerprint), ignore_errors=True)
+
+    def clear(self) -> None:
+        """Drop every cached route from both tiers."""
+        self.invalidate_dataset(keep=None)
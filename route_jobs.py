@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+
+import ids
+
+
+class JobsBusy(RuntimeError):
+    """Raised when `max_running` route jobs are already running."""
+
+
+class RouteJob:
+    """Consume a route generator in a background thread, exposing the stops found so far.
+
+    The job stops between two legs as soon as it is cancelled, closing the generator.
+    """
+
+    def __init__(self, legs: Iterator[dict], on_done: Callable[[list[dict]], None] | None = None):
+        """
+        Args:
+            legs (Iterator[dict]): Generator yielding the trip records one stop at a time.
+            on_done (Callable[[list[dict]], None] | None, optional): Called with the full
+                trip when the generator is exhausted (not when cancelled). Defaults to None.
+        """
+        self.records: list[dict] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.pushed = 0  # number of records already reported by `new_stops`
+        self.last_seen = time.monotonic()
+
+        self._legs = legs
+        self._on_done = on_done
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for record in self._legs:
+                if self._cancelled.is_set():
+                    return
+                with self._lock:
+                    self.records.append(record)
+            if self._on_done is not None:
+                self._on_done(self.records)
+        except BaseException as error:  # surfaced to the poller instead of dying silently
+            self.error = error
+        finally:
+            self._legs.close()
+            self.done = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Ask the worker thread to stop after the current leg."""
+        self._cancelled.set()
+
+    def new_stops(self) -> int | None:
+        """Return the number of stops found so far if it grew since the last call, else None."""
+        self.last_seen = time.monotonic()
+        with self._lock:
+            if len(self.records) == self.pushed:
+                return None
+            self.pushed = len(self.records)
+            return self.pushed
+
+    def head(self, stops: int) -> list[dict]:
+        """Return a copy of the first `stops` records of the trip."""
+        with self._lock:
+            return self.records[:stops]
+
+
+class JobRegistry:
+    """Thread-safe registry of running route jobs, addressed by string ids.
+
+    Jobs that are not polled for `stale_after` seconds (e.g. the browser tab was
+    closed) are cancelled the next time a job is started.
+
+    At most `max_running` jobs run at a time, each on its own thread. Cancelled
+    jobs count until their thread stops, since a leg (e.g. an optimized route)
+    cannot be interrupted: starting more jobs raises `JobsBusy`.
+    """
+
+    def __init__(self, stale_after: float = 60.0, max_running: int = ids.ROUTE_JOBS_MAX):
+        self.stale_after = stale_after
+        self.max_running = max_running
+        self._jobs: dict[str, RouteJob] = {}
+        # cancelled jobs whose thread has not stopped yet
+        self._draining: list[RouteJob] = []
+        self._lock = threading.Lock()
+
+    def _running(self) -> int:
+        """Number of jobs whose thread is still running; call with the lock held."""
+        self._draining = [job for job in self._draining if not job.done]
+        return len(self._draining) + sum(not job.done for job in self._jobs.values())
+
+    def start(self, legs: Iterator[dict], on_done: Callable[[list[dict]], None] | None = None) -> str:
+        """Start a job and return its id.
+
+        Args:
+            legs (Iterator[dict]): Generator yielding the trip records one stop at a time.
+            on_done (Callable[[list[dict]], None] | None, optional): See `RouteJob`.
+
+        Raises:
+            JobsBusy: If `max_running` jobs are already running; `legs` is closed.
+
+        Returns:
+            str: The job id.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if now - job.last_seen > self.stale_after:
+                    job.cancel()
+                    self._draining.append(job)
+                    del self._jobs[job_id]
+
+            running = self._running()
+            if running >= self.max_running:
+                legs.close()
+                raise JobsBusy(f"{running} routes are already being computed.")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = RouteJob(legs, on_done)
+        return job_id
+
+    def get(self, job_id: str | None) -> RouteJob | None:
+        """Return the job with id `job_id`, or None if unknown."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str | None) -> None:
+        """Cancel and forget a job; unknown ids are ignored."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                job.cancel()
+                self._draining.append(job)
+
+    def discard(self, job_id: str | None) -> None:
+        """Forget a finished job."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
@@ -0,0 +1,238 @@
+"""
+route_service.py
+----------------
+
+Headless route computation, independent of the Dash callbacks.
+
+`RouteService` runs `main.move_atw` on a bounded pool of worker threads:
+
+- concurrent requests for the same route (city, subset options and strategy) share one
+  computation instead of running it once each;
+- at most `max_pending` distinct routes are queued or running, further requests
+  are refused with `ServiceBusy` instead of piling up;
+- every caller waits at most its own timeout; a computation outliving it keeps
+  running and fills the route cache, so a retry is served at once.
+
+`RouteService.routes_as_completed` is the asyncio entry point: it computes the
+routes from many start cities concurrently and yields each one as soon as it is
+ready, e.g. to compare them with `stats.compute_stats`.
+
+The same service answers `GET /api/route?city=London GB` on the Flask server of
+the app (see `register`), returning the route as JSON.
+"""
+import asyncio
+import math
+import threading
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
+
+from dash import Dash
+from flask import jsonify, request
+
+import ids
+import main as routing
+from optimizer import BudgetExceeded, NoRouteHome
+from route_cache import RouteKey
+
+
+class ServiceBusy(RuntimeError):
+    """Raised when the service already has `max_pending` routes queued or running."""
+
+
+class OriginRoute(NamedTuple):
+    """Outcome of the route from one start city of `RouteService.routes_as_completed`."""
+    city: str
+    trip: list[dict] | None  # None when the route failed
+    error: Exception | None = None
+
+
+class RouteService:
+    """Compute routes on a bounded thread pool, coalescing identical requests.
+
+    Threads share the cities data and its spatial indexes with the rest of the
+    process, so a request never copies the dataset.
+    """
+
+    def __init__(self, workers: int = ids.ROUTE_WORKERS, max_pending: int = ids.ROUTE_QUEUE_SIZE,
+                 timeout: float = ids.ROUTE_TIMEOUT_S):
+        """
+        Args:
+            workers (int, optional): Routes computed at the same time. Defaults to `ids.ROUTE_WORKERS`.
+            max_pending (int, optional): Distinct routes queued or running before requests are
+                refused. Defaults to `ids.ROUTE_QUEUE_SIZE`.
+            timeout (float, optional): Default seconds a caller waits for its route.
+                Defaults to `ids.ROUTE_TIMEOUT_S`.
+        """
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="route")
+        self._pending: dict[RouteKey, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of distinct routes queued or running."""
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, str_city: str, min_population: float | None = None, countries: list[str] | None = None,
+               strategy: str | None = None, seed: int | None = None) -> Future:
+        """Return a future of the route from `str_city`, starting its computation if needed.
+
+        Cached routes are returned as completed futures without using the pool.
+
+        Args:
+            str_city (str): Name of the starting city.
+            min_population (float | None, optional): Subset threshold, see `main.subset_index`.
+            countries (list[str] | None, optional): Subset countries, see `main.subset_index`.
+            strategy (str | None, optional): Routing strategy, see `main.move_atw`. Defaults to None.
+            seed (int | None, optional): Seed of the "random" strategy. Defaults to None.
+
+        Raises:
+            ValueError: If `str_city` or a country code is not in the dataset, or the strategy is unknown.
+            ServiceBusy: If `max_pending` other routes are already queued or running.
+
+        Returns:
+            Future: Resolves to the visited cities in order.
+        """
+        min_population, countries = routing.normalize_subset(min_population, countries)
+        strategy, seed = routing.normalize_strategy(strategy, seed)
+        key = routing.route_key(str_city, min_population, countries, strategy, seed)
+        trip = routing.cached_route(key)
+        if trip is not None:
+            future = Future()
+            future.set_result(trip)
+            return future
+
+        if not (routing.cities_index().data[ids.PLACE] == str_city).any():
+            raise ValueError(f"Unknown city: {str_city!r}.")
+        # unknown country codes raise here rather than in the pool
+        routing.subset_index(min_population, countries)
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                # the same route is already on its way: share it
+                return future
+            if len(self._pending) >= self.max_pending:
+                raise ServiceBusy(f"{len(self._pending)} routes are already being computed.")
+            future = self._pool.submit(routing.move_atw, str_city, min_population, countries, strategy, seed)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key: RouteKey) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def route(self, str_city: str, min_population: float | None = None, countries: list[str] | None = None,
+              timeout: float | None = None, strategy: str | None = None, seed: int | None = None) -> list[dict]:
+        """Return the route from `str_city`, waiting at most `timeout` seconds.
+
+        Args:
+            str_city (str): Name of the starting city.
+            min_population (float | None, optional): Subset threshold, see `main.subset_index`.
+            countries (list[str] | None, optional): Subset countries, see `main.subset_index`.
+            timeout (float | None, optional): Seconds to wait. Defaults to None, the
+                timeout of the service.
+            strategy (str | None, optional): Routing strategy, see `main.move_atw`. Defaults to None.
+            seed (int | None, optional): Seed of the "random" strategy. Defaults to None.
+
+        Raises:
+            ValueError: If `str_city` or a country code is not in the dataset, or the strategy is unknown.
+            ServiceBusy: If the route cannot be queued, see `submit`.
+            TimeoutError: If the route is not ready in time; its computation goes on.
+            BudgetExceeded: If the optimal route exceeds the optimizer budget, see `optimizer.py`.
+            NoRouteHome: If no optimal loop leads back to `str_city`.
+
+        Returns:
+            list[dict]: The visited cities in order.
+        """
+        future = self.submit(str_city, min_population, countries, strategy, seed)
+        return future.result(self.timeout if timeout is None else timeout)
+
+    async def routes_as_completed(self, origins: Iterable[str], min_population: float | None = None,
+                                  countries: list[str] | None = None, timeout: float | None = None,
+                                  strategy: str | None = None,
+                                  seed: int | None = None) -> AsyncIterator[OriginRoute]:
+        """Compute the routes from several start cities concurrently, yielding them as they complete.
+
+        Every route runs on the pool of the service, sharing its bounds and the routes
+        other callers are computing. A failed route (unknown city, busy service, timeout)
+        is yielded with its error instead of interrupting the others.
+
+        Args:
+            origins (Iterable[str]): Names of the starting cities; duplicates are computed once.
+            min_population (float | None, optional): Subset threshold, see `main.subset_index`.
+            countries (list[str] | None, optional): Subset countries, see `main.subset_index`.
+            timeout (float | None, optional): Seconds to wait for each route. Defaults to
+                None, the timeout of the service.
+            strategy (str | None, optional): Routing strategy, see `main.move_atw`. Defaults to None.
+            seed (int | None, optional): Seed of the "random" strategy. Defaults to None.
+
+        Yields:
+            OriginRoute: The route of each start city, fastest first.
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        async def origin_route(city: str) -> OriginRoute:
+            try:
+                # submitting may read the route cache from disk: keep it off the event loop
+                future = await asyncio.to_thread(self.submit, city, min_population, countries, strategy, seed)
+                # shielded, so a timeout does not cancel a computation shared with other callers
+                trip = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+                return OriginRoute(city, trip)
+            except Exception as error:
+                return OriginRoute(city, None, error)
+
+        for result in asyncio.as_completed([origin_route(city) for city in dict.fromkeys(origins)]):
+            yield await result
+
+    def shutdown(self) -> None:
+        """Stop accepting routes and wait for the running ones."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _json_record(record: dict) -> dict:
+    """Replace the NaN of a record (e.g. "Dist_from_home" on the way east) by null."""
+    return {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in record.items()}
+
+
+# service shared by the app and its API
+service = RouteService()
+
+
+def register(app: Dash) -> None:
+    """Serve `GET /api/route` on the Flask server of `app`.
+
+    Query parameters: `city` (required), `min_population`, `countries` (repeated or
+    comma-separated), `strategy`, `seed` and `timeout` in seconds, capped at the
+    service timeout. Errors are reported as JSON with status 400 (missing or unknown
+    city, unknown country code or strategy), 422 (no optimal loop back to the city),
+    503 (service busy, with a Retry-After header) or 504 (the route is still being
+    computed past the wait timeout, or the optimizer exceeded its time budget).
+    """
+
+    @app.server.route('/api/route')
+    def route_api():
+        city = request.args.get('city', '').strip()
+        if not city:
+            return jsonify(error="Missing 'city' parameter."), 400
+        countries = [c for value in request.args.getlist('countries') for c in value.split(',') if c]
+        timeout = min(request.args.get('timeout', service.timeout, type=float), service.timeout)
+        try:
+            trip = service.route(city, request.args.get('min_population', type=float), countries, timeout,
+                                 request.args.get('strategy'), request.args.get('seed', type=int))
+        except ValueError as error:
+            return jsonify(error=str(error)), 400
+        except ServiceBusy as error:
+            return jsonify(error=str(error)), 503, {'Retry-After': '5'}
+        except NoRouteHome as error:
+            return jsonify(error=str(error)), 422
+        except BudgetExceeded as error:
+            # the optimizer gave up at its documented time budget: a timeout, not a server fault
+            return jsonify(error=str(error)), 504
+        except TimeoutError:
+            return jsonify(error=f"The route from {city} is still being computed, retry later."), 504
+        return jsonify(city=city, stops=len(trip), route=[_json_record(r) for r in trip])
@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+
+class ShardWriter:
+    """Append routes to one shard of a `RouteStore`.
+
+    Each shard is a pair of files: `<name>.bin` holds the pickled routes back to
+    back and `<name>.idx` holds one JSON line per route with its offset and length.
+    The index line is only written once the route bytes are flushed, so a crash
+    never leaves an index entry pointing at a partial route.
+    """
+
+    def __init__(self, directory: str, name: str):
+        self._data = open(os.path.join(directory, name + ".bin"), "ab")
+        self._index = open(os.path.join(directory, name + ".idx"), "a", encoding="utf-8")
+        self.name = name
+
+    def append(self, city: str, route: list[dict]) -> None:
+        """Store the route starting from `city`.
+
+        Args:
+            city (str): Name of the starting city.
+            route (list[dict]): The route records.
+        """
+        payload = pickle.dumps(_encode(route), protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self._data.seek(0, os.SEEK_END)
+        self._data.write(payload)
+        self._data.flush()
+        self._index.write(json.dumps({"city": city, "offset": offset, "length": len(payload)}) + "\n")
+        self._index.flush()
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+def _encode(route: list[dict]) -> dict:
+    """Convert route records to a compact column -> array mapping."""
+    frame = pd.DataFrame.from_records(route)
+    return {column: frame[column].to_numpy() for column in frame.columns}
+
+
+def _decode(columns: dict) -> list[dict]:
+    """Convert a column -> array mapping back to route records."""
+    return pd.DataFrame(columns).to_dict('records')
+
+
+class RouteStore:
+    """Append-only on-disk store of precomputed routes.
+
+    A store holds the routes computed on one dataset with one set of routing
+    parameters, in its own sub-directory of `root`. Routes are written by any
+    number of `ShardWriter`s (typically one per worker process) and read back by
+    starting city. Listing the completed cities only reads the small index files,
+    which makes batch runs resumable.
+    """
+
+    def __init__(self, root: str, fingerprint: str, params: tuple[tuple[str, object], ...]):
+        digest = hashlib.sha256(json.dumps(list(params), default=str).encode("utf-8")).hexdigest()[:16]
+        self.directory = os.path.join(root, f"{fingerprint}-{digest}")
+        self._index: dict[str, tuple[str, int, int]] | None = None
+
+    def writer(self, name: str) -> ShardWriter:
+        """Open a shard for appending.
+
+        Args:
+            name (str): Shard name, unique among concurrent writers.
+
+        Returns:
+            ShardWriter: The writer for that shard.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return ShardWriter(self.directory, name)
+
+    def _read_index(self) -> dict[str, tuple[str, int, int]]:
+        """Map every stored city to its (shard, offset, length)."""
+        index = {}
+        for path in glob.glob(os.path.join(self.directory, "*.idx")):
+            shard = os.path.splitext(os.path.basename(path))[0]
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # line cut short by an interrupted run
+                    index[entry["city"]] = (shard, entry["offset"], entry["length"])
+        return index
+
+    def completed(self) -> set[str]:
+        """Return the starting cities whose route is already stored."""
+        return set(self._read_index())
+
+    def refresh(self) -> None:
+        """Forget the loaded index, so routes stored since are found by `get`."""
+        self._index = None
+
+    def get(self, city: str) -> list[dict] | None:
+        """Load the route starting from `city`.
+
+        Args:
+            city (str): Name of the starting city.
+
+        Returns:
+            list[dict] | None: The route records, or None if the store does not hold it.
+        """
+        if self._index is None:
+            self._index = self._read_index()
+        if city not in self._index:
+            return None
+
+        shard, offset, length = self._index[city]
+        with open(os.path.join(self.directory, shard + ".bin"), "rb") as f:
+            f.seek(offset)
+            return _decode(pickle.loads(f.read(length)))
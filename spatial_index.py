@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from utils import delta_longitude, distances_from
+
+
+class CityIndex:
+    """Grid index over the coordinates of a cities DataFrame.
+
+    Cities are bucketed into longitude cells of `cell_size` degrees and, inside
+    each cell, sorted by latitude. A window query therefore only visits the cells
+    overlapping the longitude range and binary-searches the latitude range inside
+    each of them, instead of masking the whole table. Longitude cells wrap around
+    the 180° meridian, so windows crossing it are answered like any other.
+
+    All queries return row positions (usable with `DataFrame.iloc`) sorted in the
+    original row order of the indexed DataFrame.
+    """
+
+    def __init__(self, data: pd.DataFrame, cell_size: float = 1.0):
+        self.data = data
+        self.cell_size = cell_size
+        self.n_cells = int(round(360 / cell_size))
+
+        self.latitude = data["Latitude"].to_numpy(dtype=np.float64)
+        self.longitude = data["Longitude"].to_numpy(dtype=np.float64)
+
+        # sort rows by (longitude cell, latitude) and keep CSR-like cell offsets
+        cells = self._cell(self.longitude)
+        self._order = np.lexsort((self.latitude, cells))
+        self._sorted_lat = self.latitude[self._order]
+        self._offsets = np.searchsorted(cells[self._order], np.arange(self.n_cells + 1))
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def _cell(self, longitude: float | np.ndarray) -> np.ndarray:
+        """Map longitudes (any range, in degrees) to their wrapped cell number."""
+        return np.floor((np.asarray(longitude) + 180) / self.cell_size).astype(np.int64) % self.n_cells
+
+    def _cells_between(self, lon_min: float, lon_max: float) -> np.ndarray:
+        """Return the cells overlapping [lon_min, lon_max], padded by one cell on each side
+        so that floating point rounding at cell borders never drops a candidate."""
+        first = int(np.floor((lon_min + 180) / self.cell_size)) - 1
+        last = int(np.floor((lon_max + 180) / self.cell_size)) + 1
+        if last - first + 1 >= self.n_cells:
+            return np.arange(self.n_cells)
+        return np.unique(np.arange(first, last + 1) % self.n_cells)
+
+    def _candidates(self, lon_min: float, lon_max: float, lat_min: float, lat_max: float) -> np.ndarray:
+        """Return the positions of the cities in the cells covering the longitude range
+        whose latitude lies within [lat_min, lat_max]."""
+        chunks = []
+        for cell in self._cells_between(lon_min, lon_max):
+            lo, hi = self._offsets[cell], self._offsets[cell + 1]
+            if lo == hi:
+                continue
+            lats = self._sorted_lat[lo:hi]
+            start = lo + np.searchsorted(lats, lat_min, side="left")
+            stop = lo + np.searchsorted(lats, lat_max, side="right")
+            if start < stop:
+                chunks.append(self._order[start:stop])
+
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(chunks)
+
+    def east_window(self, longitude: float, latitude: float, delta: float) -> tuple[np.ndarray, np.ndarray]:
+        """Find the cities in the eastward window of a point.
+
+        The window holds every city whose longitude lies in (0°, `delta`] east of
+        `longitude` (wrapping at the 180° meridian) and whose latitude lies within
+        ±`delta` degrees of `latitude`. It requires `delta` < 180° to avoid
+        including westward points.
+
+        Args:
+            longitude (float): Longitude of the reference point in degrees.
+            latitude (float): Latitude of the reference point in degrees.
+            delta (float): Angular size of the window in degrees.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The positions of the matching cities and
+            their eastward longitudinal difference from the reference point.
+        """
+        positions = self._candidates(longitude, longitude + delta, latitude - delta, latitude + delta)
+        delta_long = delta_longitude(self.longitude[positions], longitude)
+
+        keep = (delta_long <= delta) & (delta_long > 0)
+        order = np.argsort(positions[keep], kind="stable")
+        return positions[keep][order], delta_long[keep][order]
+
+    def box(self, lon_min: float, lon_max: float, lat_min: float, lat_max: float) -> np.ndarray:
+        """Find the cities inside a longitude/latitude box.
+
+        Bounds are inclusive and compared against the raw stored longitudes, so the
+        box does not wrap: a range reaching past ±180° only matches the cities on
+        its own side of the meridian.
+
+        Args:
+            lon_min (float): Western bound in degrees.
+            lon_max (float): Eastern bound in degrees.
+            lat_min (float): Southern bound in degrees.
+            lat_max (float): Northern bound in degrees.
+
+        Returns:
+            np.ndarray: The positions of the cities inside the box.
+        """
+        positions = self._candidates(lon_min, lon_max, lat_min, lat_max)
+        lons = self.longitude[positions]
+        return np.sort(positions[(lons >= lon_min) & (lons <= lon_max)])
+
+    def nearest_east(self, longitude: float, latitude: float, delta: float, k: int,
+                     exclude: np.ndarray | None = None) -> np.ndarray:
+        """Find the `k` cities closest to a point within its eastward window.
+
+        Args:
+            longitude (float): Longitude of the reference point in degrees.
+            latitude (float): Latitude of the reference point in degrees.
+            delta (float): Angular size of the window in degrees, as in `east_window`.
+            k (int): Maximum number of cities to return.
+            exclude (np.ndarray | None, optional): Boolean mask over all indexed rows;
+                rows set to True are skipped. Defaults to None.
+
+        Returns:
+            np.ndarray: The positions of up to `k` cities, nearest first.
+        """
+        positions, _ = self.east_window(longitude, latitude, delta)
+        if exclude is not None:
+            positions = positions[~exclude[positions]]
+
+        distances = distances_from(latitude, longitude, self.latitude[positions], self.longitude[positions])
+        nearest = np.argsort(distances, kind="stable")[:k]
+        return positions[nearest]
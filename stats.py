@@ -1,7 +1,61 @@
+import weakref
+from typing import NamedTuple
+
 import pandas as pd
-from dash import html, Input, Output, Dash
+from dash import html, Input, Output, Dash, no_update
+
+import ids
+from main import load_trip
+
+
+class TripSummary(NamedTuple):
+    """Aggregates of a trip, shared by the stats panel and the lists."""
+    n_cities: int  # visited cities, the starting one excluded
+    n_countries: int  # distinct country codes
+    total_time_hours: float
+    total_distance: float
+    large_cities: list[str]  # visited cities with population ≥ `ids.LARGE_CITY`, in order
+    countries: list[str]  # visited country names, in order
+
+
+# summaries of the trips alive, by object id; entries are dropped with their trip
+_summaries: dict[int, TripSummary] = {}
+
+
+def trip_summary(trip: pd.DataFrame) -> TripSummary:
+    """
+    Compute the aggregates of a trip, once per trip.
+
+    Trips served by `main.load_trip` are shared and never modified, so the summary
+    is memoized on the trip object itself and every panel reading the same trip
+    reuses it.
 
-def compute_stats(trip: list[dict]) -> dict:
+    Args:
+        trip (pd.DataFrame): Trip data, one row per visited city with distance,
+            time, population and country fields.
+
+    Returns:
+        TripSummary: The aggregates of the trip.
+    """
+    key = id(trip)
+    summary = _summaries.get(key)
+    if summary is None:
+        large = trip["Population"].to_numpy() >= ids.LARGE_CITY
+        summary = TripSummary(
+            n_cities=trip.shape[0] - 1,
+            n_countries=trip["Country"].nunique(),
+            total_time_hours=trip["Time"].sum(),
+            total_distance=trip["Distance_km"].sum(),
+            large_cities=list(pd.unique(trip[ids.PLACE].to_numpy()[large])),
+            countries=list(trip["Country name"].unique()),
+        )
+        _summaries[key] = summary
+        # forget the summary when the trip is garbage collected, before its id can be reused
+        weakref.finalize(trip, _summaries.pop, key, None)
+    return summary
+
+
+def compute_stats(trip: pd.DataFrame) -> dict:
     """
     Compute summary statistics for the trip.
 
@@ -10,30 +64,25 @@ def compute_stats(trip: list[dict]) -> dict:
     with the fields required for distance and time computation.
 
     Args:
-        trip (list[dict]): Trip data as a list of dictionaries, each representing
-            a visited city with distance, time and country fields.
+        trip (pd.DataFrame): Trip data, one row per visited city with distance,
+            time and country fields.
 
     Returns:
         dict: A dictionary containing all computed summary statistics.
     """
+    summary = trip_summary(trip)
 
-    # Convert trip list to DataFrame
-    trip = pd.DataFrame.from_records(trip)
-
-    n_cities = trip.shape[0] - 1
-
-    n_countries = trip["Country"].nunique()
-
-    total_time_hours = trip["Time"].sum()
+    total_time_hours = summary.total_time_hours
     total_time_days = round(total_time_hours/24, 2)
 
-    total_distance = round(trip["Distance_km"].sum(), 2)
+    total_distance = round(summary.total_distance, 2)
 
-    average_speed = round(total_distance/total_time_hours, 2)
+    # the first stop of a streamed route has no travel time yet
+    average_speed = round(total_distance/total_time_hours, 2) if total_time_hours else 0.0
 
     return {
-        "Visited cities": n_cities,
-        "Visited countries": n_countries,
+        "Visited cities": summary.n_cities,
+        "Visited countries": summary.n_countries,
         "Total time in hours": total_time_hours,
         "Total time in days": total_time_days,
         "Total distance in km": total_distance,
@@ -59,7 +108,10 @@ def stat_render(app: Dash) -> html.Div:
         Output('stats-output', 'children'),
         [Input('trip', 'data'),]
     )
-    def update_stats(trip: list[dict]) -> html.Div:
+    def update_stats(handle: dict) -> html.Div:
+       trip = load_trip(handle)
+       if trip is None:
+           return no_update
        # Compute summary statistics
        stats = compute_stats(trip)
        # Format stats as a grid of cards
@@ -100,8 +152,8 @@ def list_render(app: Dash, mode: str) -> html.Div:
         - "cities": list of visited cities with population ≥ 200k
         - "countries": list of visited countries
 
-        The callback reads the trip, extracts the appropriate items, and returns
-        the formatted HTML list.
+        The callback reads the trip summary (see `trip_summary`), extracts the
+        appropriate items, and returns the formatted HTML list.
 
         Args:
             app (Dash): Dash application instance for callback registration.
@@ -114,14 +166,15 @@ def list_render(app: Dash, mode: str) -> html.Div:
         Output(f'list-output-{mode}', 'children'),
         Input('trip', 'data'),
     )
-    def update_list(trip: list[dict]) -> html.Div:
-        # Convert trip to DataFrame
-        trip = pd.DataFrame.from_records(trip)
+    def update_list(handle: dict) -> html.Div:
+        trip = load_trip(handle)
+        if trip is None:
+            return no_update
 
         if mode == "cities":
-            items = list(trip.loc[trip["Population"] >= 200_000]["City_Country"].unique()) # Cities with population ≥ 200k
+            items = trip_summary(trip).large_cities # Cities with population ≥ 200k
         elif mode == "countries":
-            items = list(trip["Country name"].unique()) # List of visited countries
+            items = trip_summary(trip).countries # List of visited countries
         else:
             raise ValueError(f"Invalid mode: {mode}. Valid modes are 'cities' and 'countries'.")
 
@@ -0,0 +1,93 @@
+"""
+strategies.py
+-------------
+
+Registry of the routing strategies choosing the next city on the way east.
+
+Every step of `main.iter_route` ranks the nearest unvisited cities once, from
+the successor graph or the live neighbor search, into a `utils.Candidates`
+bundle of arrays (rows, population, country change, distance, longitudinal
+gap, travel time and speed). A strategy only picks one of them, so adding one
+costs no extra search. Near home, the route always heads back to the start
+(`utils.homeward_candidate`), whatever the strategy.
+
+New strategies are added with the `strategy` decorator.
+
+The "optimal" choice of the UI is not a strategy of this registry: instead of
+choosing step by step, `optimizer.py` searches the loop with the smallest total
+time over the same candidates.
+"""
+from collections.abc import Callable
+
+import numpy as np
+
+from utils import Candidates
+
+# a strategy returns the index of the chosen candidate; the generator is seeded once per route
+Strategy = Callable[[Candidates, np.random.Generator], int]
+
+STRATEGIES: dict[str, Strategy] = {}
+# labels shown in the UI, in registration order
+STRATEGY_LABELS: dict[str, str] = {}
+
+DEFAULT_STRATEGY = "fastest"
+# whole-route optimization instead of a step-by-step strategy, see optimizer.py
+OPTIMAL_STRATEGY = "optimal"
+
+
+def strategy(name: str, label: str) -> Callable[[Strategy], Strategy]:
+    """Register a strategy under `name`, shown as `label` in the UI."""
+    def register(choose: Strategy) -> Strategy:
+        STRATEGIES[name] = choose
+        STRATEGY_LABELS[name] = label
+        return choose
+    return register
+
+
+def get_strategy(name: str) -> Strategy:
+    """Return the strategy registered under `name`.
+
+    Raises:
+        ValueError: If no strategy has this name.
+    """
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy: {name!r}. Valid strategies are {', '.join(STRATEGIES)}.") from None
+
+
+@strategy("fastest", "Fastest longitudinal speed")
+def fastest(candidates: Candidates, rng: np.random.Generator) -> int:
+    """Highest longitudinal speed (Dist_long / Time), the original rule."""
+    return int(np.argmax(candidates.speed))
+
+
+@strategy("populous", "Most populous cities")
+def populous(candidates: Candidates, rng: np.random.Generator) -> int:
+    """Largest city, the nearest one on ties."""
+    return int(np.argmax(candidates.population))
+
+
+@strategy("fewest_countries", "Fewest countries")
+def fewest_countries(candidates: Candidates, rng: np.random.Generator) -> int:
+    """Fastest city of the current country, and only leave it when no candidate is left there."""
+    speed = np.where(candidates.foreign, -np.inf, candidates.speed)
+    if np.isneginf(speed).all():
+        return fastest(candidates, rng)
+    return int(np.argmax(speed))
+
+
+@strategy("shortest", "Shortest hops")
+def shortest(candidates: Candidates, rng: np.random.Generator) -> int:
+    """Nearest city."""
+    return int(np.argmin(candidates.distance_km))
+
+
+@strategy("random", "Random (seeded)")
+def random(candidates: Candidates, rng: np.random.Generator) -> int:
+    """Any candidate, drawn from the generator of the route."""
+    return int(rng.integers(len(candidates.positions)))
+
+
+# listed last in the UI, after the step-by-step strategies
+STRATEGY_LABELS[OPTIMAL_STRATEGY] = "Minimum total time (optimizer)"
@@ -0,0 +1,270 @@
+"""
+successor_graph.py
+------------------
+
+Precomputed eastward successors of every city, for routing without searching.
+
+On the way east the next city only depends on the current city and on the
+cities already visited: `calculate_neighbors` widens a window east of the
+current city (1°, 2°, 4°... up to 64°) until it holds 3 unvisited cities, and
+the fastest of the 3 nearest is taken. This module runs those searches once per
+city, offline, and keeps for each city its nearest candidates in compact
+CSR-style arrays: the window level that first contains each candidate, its
+distance, its longitudinal gap and whether it lies in another country.
+
+`SuccessorGraph.candidates` then ranks the candidates of a step with a few
+array lookups, for any routing strategy (see `strategies.py`). Lists are
+complete for the smallest levels and truncated to the nearest candidates of
+the last one, so the result is exactly the live search's. When visited cities
+leave too few candidates to decide, it returns None and the caller falls back
+to the live search.
+
+Usage:
+    python successor_graph.py --workers 8 --successors 16
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import ids
+from utils import Candidates, distances_from, travel_times
+
+if TYPE_CHECKING:
+    from spatial_index import CityIndex
+    from trip import TripBuilder
+
+# windows tried by `calculate_neighbors` with its default delta (1°) and delta_max (90°)
+SEARCH_DELTAS = (1, 2, 4, 8, 16, 32, 64)
+
+# arrays saved for each graph
+_ARRAYS = ("offsets", "targets", "level", "distance", "dist_long", "foreign", "complete")
+
+
+def city_successors(index: "CityIndex", position: int, max_successors: int = ids.SUCCESSORS
+                    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+    """Compute the successor list of one city.
+
+    The window is widened like in `calculate_neighbors` until it holds
+    `max_successors` candidates (or reaches 64°). Every level below the last one
+    is therefore complete; the last level is cut to its nearest candidates.
+
+    Args:
+        index (CityIndex): Index over the routing data.
+        position (int): Row of the city.
+        max_successors (int, optional): Maximum length of the list. Defaults to `ids.SUCCESSORS`.
+
+    Returns:
+        tuple: Targets, levels, distances and longitudinal gaps, sorted by level,
+        distance and row, and the number of complete levels.
+    """
+    lat, lon = index.latitude[position], index.longitude[position]
+    for delta in SEARCH_DELTAS:
+        targets, dist_long = index.east_window(lon, lat, delta)
+        distance = distances_from(lat, lon, index.latitude[targets], index.longitude[targets])
+        keep = distance != 0
+        if keep.sum() >= max_successors:
+            break
+    targets, dist_long, distance = targets[keep], np.abs(dist_long[keep]), distance[keep]
+    final = SEARCH_DELTAS.index(delta)
+
+    # the first window of `calculate_neighbors` containing each candidate, with the same bounds
+    lats = index.latitude[targets]
+    level = np.full(targets.size, final, dtype=np.int8)
+    for l, d in reversed(list(enumerate(SEARCH_DELTAS[:final]))):
+        level[(dist_long <= d) & (lats >= lat - d) & (lats <= lat + d)] = l
+
+    order = np.lexsort((targets, distance, level))[:max_successors]
+    complete = final + 1 if targets.size <= max_successors else final
+    return targets[order], level[order], distance[order], dist_long[order], complete
+
+
+class SuccessorGraph:
+    """Ranked eastward successors of every city, as CSR arrays over the rows of the routing data.
+
+    The successors of the city at row `p` are the entries `offsets[p]:offsets[p + 1]`
+    of the other arrays. `complete[p]` levels of its list are complete.
+    """
+
+    def __init__(self, offsets: np.ndarray, targets: np.ndarray, level: np.ndarray, distance: np.ndarray,
+                 dist_long: np.ndarray, foreign: np.ndarray, complete: np.ndarray):
+        self.offsets = offsets
+        self.targets = targets
+        self.level = level
+        self.distance = distance
+        self.dist_long = dist_long
+        self.foreign = foreign
+        self.complete = complete
+
+    def __len__(self) -> int:
+        return len(self.complete)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    @classmethod
+    def build(cls, index: "CityIndex", max_successors: int = ids.SUCCESSORS,
+              positions: np.ndarray | None = None) -> "SuccessorGraph":
+        """Compute the successor lists of the cities of `index`.
+
+        Args:
+            index (CityIndex): Index over the routing data.
+            max_successors (int, optional): Maximum length of each list, at least 3.
+                Defaults to `ids.SUCCESSORS`.
+            positions (np.ndarray | None, optional): Rows to compute, e.g. one chunk
+                of a parallel build. Defaults to None, every row.
+
+        Returns:
+            SuccessorGraph: The graph of the rows, in order.
+        """
+        if positions is None:
+            positions = np.arange(len(index))
+        country = index.data["Country"].to_numpy()
+
+        lists = [city_successors(index, p, max_successors) for p in positions]
+        targets = np.concatenate([l[0] for l in lists]).astype(np.int32)
+        sources = np.repeat(positions, [l[0].size for l in lists])
+        return cls(
+            offsets=np.concatenate([[0], np.cumsum([l[0].size for l in lists])]).astype(np.int64),
+            targets=targets,
+            level=np.concatenate([l[1] for l in lists]),
+            distance=np.concatenate([l[2] for l in lists]),
+            dist_long=np.concatenate([l[3] for l in lists]),
+            foreign=country[targets] != country[sources],
+            complete=np.array([l[4] for l in lists], dtype=np.int8),
+        )
+
+    @classmethod
+    def concat(cls, parts: list["SuccessorGraph"]) -> "SuccessorGraph":
+        """Join graphs built on consecutive chunks of rows."""
+        sizes = np.cumsum([0] + [part.offsets[-1] for part in parts[:-1]])
+        return cls(
+            offsets=np.concatenate([[0]] + [part.offsets[1:] + size for part, size in zip(parts, sizes)]),
+            **{name: np.concatenate([getattr(part, name) for part in parts]) for name in _ARRAYS[1:]},
+        )
+
+    def save(self, directory: str, fingerprint: str) -> str:
+        """Write the graph of the dataset with `fingerprint` to `directory`; return the file path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{fingerprint}.npz")
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **{name: getattr(self, name) for name in _ARRAYS})
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, directory: str, fingerprint: str) -> "SuccessorGraph | None":
+        """Read the graph of the dataset with `fingerprint`, or None if it was never built
+        (or in an older layout)."""
+        path = os.path.join(directory, f"{fingerprint}.npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            if not set(_ARRAYS) <= set(arrays.files):
+                return None
+            return cls(**{name: arrays[name] for name in _ARRAYS})
+
+    def candidates(self, position: int, trip: "TripBuilder", places: np.ndarray,
+                   population: np.ndarray) -> Candidates | None:
+        """Rank the candidates of the eastward step of `main.iter_route` from the city at `position`.
+
+        Args:
+            position (int): Row of the current city.
+            trip (TripBuilder): The trip built so far, holding the visited cities.
+            places (np.ndarray): `ids.PLACE` of every row of the routing data.
+            population (np.ndarray): Population of every row of the routing data.
+
+        Returns:
+            Candidates | None: The 3 candidates of `utils.rank_candidates`, with rows of
+            the routing data as positions, or None if the list cannot tell them and
+            the live search must be run.
+        """
+        lo, hi = self.offsets[position], self.offsets[position + 1]
+        targets = self.targets[lo:hi]
+        free = ~trip.is_visited(places[targets])
+        level = self.level[lo:hi]
+
+        # smallest window holding 3 unvisited cities, as long as the list knows it
+        counts = np.bincount(level[free], minlength=len(SEARCH_DELTAS))
+        reached = np.flatnonzero(np.cumsum(counts) >= 3)
+        if not reached.size:
+            return None
+        last = reached[0]
+        # a truncated level lists its nearest cities: enough if 3 of them are unvisited
+        if last >= self.complete[position] and counts[last] < 3:
+            return None
+
+        listed = np.flatnonzero(free & (level <= last))
+        nearest = lo + listed[np.lexsort((targets[listed], self.distance[lo:hi][listed]))[:3]]
+        rows = self.targets[nearest]
+        foreign = self.foreign[nearest]
+        dist_long = self.dist_long[nearest]
+        time = travel_times(population[rows], foreign)
+        return Candidates(
+            positions=rows,
+            place=places[rows],
+            population=population[rows],
+            foreign=foreign,
+            distance_km=self.distance[nearest],
+            dist_long=dist_long,
+            time=time,
+            speed=dist_long / time,
+        )
+
+
+# index of the parent process, shared with the forked workers
+_index: "CityIndex | None" = None
+
+
+def _build_chunk(args: tuple[np.ndarray, int]) -> SuccessorGraph:
+    positions, max_successors = args
+    return SuccessorGraph.build(_index, max_successors, positions)
+
+
+def build_parallel(index: "CityIndex", max_successors: int = ids.SUCCESSORS,
+                   workers: int = 1, chunk: int = 2_000) -> SuccessorGraph:
+    """Build the graph of `index` on a pool of forked processes sharing the index.
+
+    Args:
+        index (CityIndex): Index over the routing data.
+        max_successors (int, optional): Maximum length of each list. Defaults to `ids.SUCCESSORS`.
+        workers (int, optional): Number of worker processes. Defaults to 1, building in-process.
+        chunk (int, optional): Rows per task. Defaults to 2'000.
+
+    Returns:
+        SuccessorGraph: The graph of every row.
+    """
+    tasks = [(positions, max_successors) for positions in np.array_split(
+        np.arange(len(index)), max(1, -(-len(index) // chunk)))]
+    if workers <= 1:
+        return SuccessorGraph.concat([SuccessorGraph.build(index, max_successors, p) for p, _ in tasks])
+
+    global _index
+    _index = index
+    with mp.get_context("fork").Pool(workers) as pool:
+        return SuccessorGraph.concat(pool.map(_build_chunk, tasks))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute the eastward successors of every city.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--successors", type=int, default=ids.SUCCESSORS,
+                        help="maximum number of successors kept per city")
+    args = parser.parse_args(argv)
+
+    # imported here so the graph itself does not load the routing data
+    import main as routing
+
+    start = time.perf_counter()
+    graph = build_parallel(routing.cities_index(), max(3, args.successors), args.workers)
+    path = graph.save(ids.SUCCESSOR_GRAPH_DIR, routing.cities_fingerprint())
+    print(f"{len(graph)} cities, {graph.offsets[-1]} successors ({graph.nbytes / 2**20:.1f} MiB) "
+          f"in {time.perf_counter() - start:.1f}s, saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
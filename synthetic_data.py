@@ -0,0 +1,214 @@
+"""
+synthetic_data.py
+-----------------
+
+Deterministic synthetic cities dataset, in the layout of the cleaned data.
+
+It works fully offline and scales from a few thousand to tens of millions of
+cities, so routing can be tested and benchmarked at any size and density.
+Cities are scattered over rough continental regions, dense in Europe and sparse
+in the Pacific. Most of them are grouped in clusters of varying size and spread
+around a populated center, the others are spread uniformly over their region.
+Edge cases the routing must survive are added on request: cities on both sides
+of (and exactly on) the 180° meridian, cities up to the poles and cities sharing
+the coordinates of another one. A few real cities are always included at their
+real position so routes can start from known places.
+
+The loader serves synthetic data instead of the real dataset when the
+`ATW_SYNTHETIC_ROWS` environment variable is set (see `import_data.CitiesLoader`).
+
+Usage:
+    python synthetic_data.py --rows 10000 100000 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import ids
+from import_data import ROUTING_COLUMNS, compact_dtypes
+
+# always present: (city, country code, country name, latitude, longitude, population)
+ANCHORS = [
+    ("London", "gb", "United Kingdom", 51.5085, -0.1257, 7_421_228),
+    ("Paris", "fr", "France", 48.8534, 2.3488, 2_138_551),
+    ("Apia", "ws", "Samoa", -13.8333, -171.7667, 40_407),
+    ("Suva", "fj", "Fiji", -18.1416, 178.4415, 77_366),
+    ("Anadyr", "ru", "Russian Federation", 64.7350, 177.5167, 11_000),
+    ("Tromso", "no", "Norway", 69.6496, 18.9570, 52_436),
+    ("Alert", "ca", "Canada", 82.5018, -62.3481, 62),
+    ("McMurdo Station", "aq", "Antarctica", -77.8460, 166.6760, 1_000),
+]
+
+# (latitude range, longitude range, share of the cities, countries as (code, name))
+REGIONS = [
+    ((36, 70), (-10, 40), 0.35, [("gb", "United Kingdom"), ("fr", "France"), ("de", "Germany"),
+                                 ("it", "Italy"), ("es", "Spain"), ("no", "Norway"), ("pl", "Poland")]),
+    ((5, 55), (40, 145), 0.30, [("ru", "Russian Federation"), ("cn", "China"), ("in", "India"),
+                                ("jp", "Japan"), ("ir", "Iran")]),
+    ((50, 72), (40, 180), 0.04, [("ru", "Russian Federation")]),
+    ((15, 65), (-165, -55), 0.15, [("us", "United States"), ("ca", "Canada"), ("mx", "Mexico")]),
+    ((-55, 12), (-82, -35), 0.07, [("br", "Brazil"), ("ar", "Argentina"), ("co", "Colombia")]),
+    ((-35, 35), (-17, 50), 0.06, [("ng", "Nigeria"), ("za", "South Africa"), ("eg", "Egypt")]),
+    ((-45, -10), (113, 180), 0.025, [("au", "Australia"), ("nz", "New Zealand")]),
+    ((-25, 20), (150, 220), 0.005, [("fj", "Fiji"), ("ws", "Samoa"), ("ki", "Kiribati")]),
+]
+
+# average number of cities per cluster
+CITIES_PER_CLUSTER = 200
+# number of cities of each kind of edge case
+EDGE_CASE_CITIES = 200
+
+
+def _random_names(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Draw `n` capitalized 7-letter names."""
+    letters = rng.integers(ord("a"), ord("z") + 1, (n, 7), dtype=np.uint8)
+    letters[:, 0] -= ord("a") - ord("A")
+    return letters.view("S7").ravel().astype(str)
+
+
+def _wrap(longitude: np.ndarray) -> np.ndarray:
+    """Bring longitudes back to [-180, 180)."""
+    return (longitude + 180) % 360 - 180
+
+
+def _frame(rng: np.random.Generator, lat: np.ndarray, lon: np.ndarray, population: np.ndarray,
+           code: np.ndarray, country_name: np.ndarray) -> pd.DataFrame:
+    """Assemble randomly named cities in the cleaned layout."""
+    return pd.DataFrame({
+        ids.PLACE: np.strings.add(np.strings.add(_random_names(rng, lat.size), " "),
+                                  np.strings.upper(code.astype(str))).astype(object),
+        "Latitude": lat.round(7),
+        "Longitude": lon.round(7),
+        "Population": population,
+        "Country": code,
+        "Country name": country_name,
+    })
+
+
+def _region_cities(rng: np.random.Generator, n: int, clustering: float) -> pd.DataFrame:
+    """Scatter `n` cities over `REGIONS`, a `clustering` share of them in clusters."""
+    shares = np.array([region[2] for region in REGIONS])
+    region = rng.choice(len(REGIONS), size=n, p=shares / shares.sum())
+    clustered = rng.random(n) < clustering
+
+    lat = np.empty(n)
+    lon = np.empty(n)
+    population = rng.lognormal(7.5, 1.5, n)
+    code = np.empty(n, dtype=object)
+    country_name = np.empty(n, dtype=object)
+
+    for r, ((lat_min, lat_max), (lon_min, lon_max), _, countries) in enumerate(REGIONS):
+        rows = np.flatnonzero(region == r)
+        lat[rows] = rng.uniform(lat_min, lat_max, rows.size)
+        lon[rows] = rng.uniform(lon_min, lon_max, rows.size)
+
+        # clusters with heavy-tailed sizes and spreads, around a populated center
+        members = rows[clustered[rows]]
+        k = max(1, members.size // CITIES_PER_CLUSTER)
+        center_lat = rng.uniform(lat_min, lat_max, k)
+        center_lon = rng.uniform(lon_min, lon_max, k)
+        weight = rng.pareto(1.2, k) + 1
+        spread = 0.05 + rng.exponential(0.6, k)
+        cluster = rng.choice(k, size=members.size, p=weight / weight.sum())
+        offset = rng.normal(size=(2, members.size))
+        lat[members] = np.clip(center_lat[cluster] + offset[0] * spread[cluster], -90, 90)
+        lon[members] = center_lon[cluster] + offset[1] * spread[cluster] / np.maximum(
+            np.cos(np.radians(lat[members])), 0.05)
+        # cities close to the center of their cluster are larger
+        population[members] *= 1 + 50 * np.exp(-0.5 * (offset ** 2).sum(axis=0))
+
+        picked = rng.integers(0, len(countries), rows.size)
+        code[rows] = np.array([c for c, _ in countries], dtype=object)[picked]
+        country_name[rows] = np.array([name for _, name in countries], dtype=object)[picked]
+
+    return _frame(rng, lat, _wrap(lon), np.round(population), code, country_name)
+
+
+def _edge_cities(rng: np.random.Generator, cities: pd.DataFrame) -> pd.DataFrame:
+    """Cities at the 180° meridian, near the poles and at the coordinates of other cities."""
+    m = EDGE_CASE_CITIES
+
+    # on both sides of the antimeridian, the first two exactly on it
+    side = np.where(rng.random(m) < 0.5, 1.0, -1.0)
+    meridian_lon = side * (180 - rng.uniform(0, 0.5, m))
+    meridian_lon[:2] = [180.0, -180.0]
+    meridian = _frame(rng, rng.uniform(-45, 70, m), meridian_lon, np.round(rng.lognormal(6, 1.5, m)),
+                      np.where(side > 0, "fj", "ws").astype(object),
+                      np.where(side > 0, "Fiji", "Samoa").astype(object))
+
+    # up to both poles, the first two exactly on them
+    north = rng.random(m) < 0.5
+    polar_lat = np.where(north, 1, -1) * rng.uniform(84, 90, m)
+    polar_lat[:2] = [90.0, -90.0]
+    north[:2] = [True, False]
+    polar = _frame(rng, polar_lat, rng.uniform(-180, 180, m), np.round(rng.lognormal(3, 1, m)),
+                   np.where(north, "gl", "aq").astype(object),
+                   np.where(north, "Greenland", "Antarctica").astype(object))
+
+    # other names at the coordinates of existing cities (zero distance between them)
+    twins = cities.sample(n=min(m, len(cities)), random_state=rng.integers(2**32))
+    twins = _frame(rng, twins["Latitude"].to_numpy(), twins["Longitude"].to_numpy(),
+                   twins["Population"].to_numpy(), twins["Country"].to_numpy(dtype=object),
+                   twins["Country name"].to_numpy(dtype=object))
+
+    return pd.concat([meridian, polar, twins], ignore_index=True)
+
+
+def generate_cities(n: int = 50_000, seed: int = 0, clustering: float = 0.7,
+                    edge_cases: bool = True) -> pd.DataFrame:
+    """Generate a synthetic cleaned cities dataset.
+
+    The same arguments always give the same dataset. Names are random, so a few
+    duplicated places may be dropped and the result can be slightly smaller than `n`.
+
+    Args:
+        n (int, optional): Number of random cities. Defaults to 50'000.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        clustering (float, optional): Share of the cities grouped in clusters, the
+            others being spread uniformly over their region. Defaults to 0.7.
+        edge_cases (bool, optional): Add `EDGE_CASE_CITIES` cities of each edge case
+            (antimeridian, poles, shared coordinates). Defaults to True.
+
+    Returns:
+        pd.DataFrame: The cities, anchors first, with the columns of
+        `import_data.ROUTING_COLUMNS` and compact dtypes.
+    """
+    rng = np.random.default_rng(seed)
+
+    anchors = pd.DataFrame({
+        ids.PLACE: [f"{c} {cc.upper()}" for c, cc, *_ in ANCHORS],
+        "Latitude": [a[3] for a in ANCHORS],
+        "Longitude": [a[4] for a in ANCHORS],
+        "Population": [float(a[5]) for a in ANCHORS],
+        "Country": [a[1] for a in ANCHORS],
+        "Country name": [a[2] for a in ANCHORS],
+    })
+    parts = [anchors, _region_cities(rng, n, clustering)]
+    if edge_cases:
+        parts.append(_edge_cities(rng, parts[1]))
+
+    cities = pd.concat(parts, ignore_index=True)
+    cities = cities.drop_duplicates(ids.PLACE).reset_index(drop=True)
+    return compact_dtypes(cities[ROUTING_COLUMNS])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic cities datasets and report their cost.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="dataset sizes to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--clustering", type=float, default=0.7, help="share of clustered cities")
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        start = time.perf_counter()
+        cities = generate_cities(rows, args.seed, args.clustering)
+        seconds = time.perf_counter() - start
+        print(f"{rows:>11} requested, {len(cities):>11} generated in {seconds:7.2f}s, "
+              f"{cities.memory_usage(deep=True).sum() / 2**20:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
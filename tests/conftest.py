@@ -0,0 +1,50 @@
+"""
+Shared fixtures of the test suite.
+
+Everything runs offline on a small synthetic dataset (see `synthetic_data.py`),
+so the tests only depend on the code.
+"""
+import pytest
+
+import ids
+import synthetic_data
+from import_data import loader
+from route_cache import RouteCache
+
+# number of random cities of the test dataset
+ROWS = 5_000
+
+
+@pytest.fixture(scope="session")
+def cities():
+    """The synthetic cities dataset of the tests, with compact dtypes."""
+    return synthetic_data.generate_cities(ROWS)
+
+
+@pytest.fixture
+def use_data(monkeypatch, tmp_path):
+    """Route on a given dataset, without the caches and graphs on disk.
+
+    Returns:
+        Callable[[pd.DataFrame], module]: Serves the dataset and returns the `main` module.
+    """
+    import main
+
+    # nothing precomputed in the working directory may be served
+    monkeypatch.setattr(ids, "ROUTE_STORE_DIR", str(tmp_path / "route_store"))
+    monkeypatch.setattr(ids, "SUCCESSOR_GRAPH_DIR", str(tmp_path / "successor_graph"))
+    monkeypatch.setattr(main, "route_cache", RouteCache(directory=None))
+
+    def use(data):
+        loader.use(data)
+        main.reset_routing()
+        return main
+
+    yield use
+    main.reset_routing()
+
+
+@pytest.fixture
+def routing(cities, use_data):
+    """The `main` module routing on `cities`."""
+    return use_data(cities)
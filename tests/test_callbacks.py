@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from dash import no_update
+
+from route_jobs import JobRegistry
+
+
+@pytest.fixture
+def ui(routing, monkeypatch):
+    """The `main` module with a job registry of its own, for the page callbacks."""
+    monkeypatch.setattr(routing, "route_jobs", JobRegistry())
+    return routing
+
+
+def _wait(ui, job_handle: dict, timeout: float = 30) -> tuple:
+    """Poll the job of `job_handle` until its route is complete and return the last poll."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = ui.poll_route(0, job_handle)
+        if result[1]:
+            return result
+        time.sleep(0.05)
+    raise TimeoutError("The route job did not finish.")
+
+
+def test_cleared_city_starts_nothing(ui):
+    _, job_handle, _, _ = ui.start_route("Paris FR", 0, None, "fastest", None, None)
+    job = ui.route_jobs.get(job_handle["job"])
+
+    assert ui.start_route(None, 0, None, "fastest", None, job_handle) == (no_update, None, True, '')
+    assert ui.start_route('', 0, None, "fastest", None, None) == (no_update, None, True, '')
+    # the running route was cancelled, and no job was started for the empty city
+    assert job.cancelled
+    assert ui.route_jobs.get(job_handle["job"]) is None
+    assert not ui.route_jobs._jobs
+
+
+def test_streamed_route_is_cached(ui):
+    trip, job_handle, disabled, status = ui.start_route("Paris FR", 0, None, "fastest", None, None)
+    assert trip is no_update and not disabled and "Paris FR" in status
+
+    handle, disabled, status = _wait(ui, job_handle)
+    assert disabled and status == ''
+    assert ui.load_trip(handle)["City_Country"].tolist() == [r["City_Country"] for r in ui.move_atw("Paris FR")]
+
+    # the finished route is served at once
+    handle, job, disabled, _ = ui.start_route("Paris FR", 0, None, "fastest", None, None)
+    assert job is None and disabled and handle["stops"] == len(ui.move_atw("Paris FR"))
+
+
+def test_streaming_keeps_the_displayed_routes(ui, monkeypatch):
+    monkeypatch.setattr(ui, "trip_store", ui.TripStore(max_entries=2))
+    keys = [ui.route_key(city) for city in ("London GB", "Apia WS")]
+    for key in keys:
+        assert ui.load_trip(ui.route_handle(key.city, stops=len(ui.move_atw(key.city)))) is not None
+
+    _, job_handle, _, _ = ui.start_route("Paris FR", 0, None, "fastest", None, None)
+    prefixes, done = 0, False
+    while not done:
+        handle, done, _ = ui.poll_route(0, job_handle)
+        if isinstance(handle, dict) and "job" in handle:
+            prefixes += 1
+            assert len(ui.load_trip(handle)) == handle["stops"]
+        time.sleep(0.005)
+
+    assert prefixes > 2
+    # the routes of the other callbacks are still held, whatever the number of prefixes
+    assert all(ui.trip_store.get(f"route:{key.fingerprint}:{key.digest()}") is not None for key in keys)
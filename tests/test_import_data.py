@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from import_data import compact_dtypes
+
+
+def test_compact_dtypes_keeps_every_value():
+    data = pd.DataFrame({
+        "Population": [8_000_000.0, 120.0, 0.0, 45_000.0],
+        "Latitude": [51.5085, -13.8333, 0.1, 90.0],
+        "Half": [0.5, 0.25, -1.75, np.nan],
+        "Missing": [1.0, np.nan, 3.0, 4.0],
+        "Country": ["gb", "gb", "fr", "gb"],
+        "City_Country": ["London GB", "Leeds GB", "Paris FR", "York GB"],
+    })
+
+    compact = compact_dtypes(data)
+
+    assert compact["Population"].dtype == np.int32
+    # 51.5085 has no exact float32 value, 0.5 and the others do
+    assert compact["Latitude"].dtype == np.float64
+    assert compact["Half"].dtype == np.float32
+    assert compact["Missing"].dtype == np.float32
+    assert isinstance(compact["Country"].dtype, pd.CategoricalDtype)
+    assert compact["City_Country"].dtype == object
+    pd.testing.assert_frame_equal(compact.astype(data.dtypes.to_dict()), data)
+
+
+def test_compact_dtypes_of_the_cities(cities):
+    plain = cities.astype({"Population": np.float64, "Country": object, "Country name": object})
+
+    compact = compact_dtypes(plain)
+
+    pd.testing.assert_frame_equal(compact, cities)
+    assert compact.memory_usage(deep=True).sum() < plain.memory_usage(deep=True).sum()
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import ids
+
+# routes of the test dataset from a few start cities: places visited, total time and distance
+with open(os.path.join(os.path.dirname(__file__), "data", "routes.json")) as file:
+    ROUTES = json.load(file)
+
+
+def _plain(cities):
+    """The cities with the dtypes of the uncompressed dataset."""
+    return cities.astype({"Population": np.float64, "Country": object, "Country name": object})
+
+
+@pytest.mark.parametrize("dtypes", ["compact", "plain"])
+@pytest.mark.parametrize("city", sorted(ROUTES))
+def test_route_matches_the_reference(cities, use_data, city, dtypes):
+    routing = use_data(cities if dtypes == "compact" else _plain(cities))
+
+    route = routing.compute_route(city)
+
+    assert [record[ids.PLACE] for record in route] == ROUTES[city]["places"]
+    assert sum(record["Time"] for record in route) == ROUTES[city]["time"]
+    assert sum(record["Distance_km"] for record in route) == pytest.approx(ROUTES[city]["distance_km"], abs=1e-3)
+
+
+def test_cached_route_is_the_computed_one(routing):
+    route = routing.move_atw("Paris FR")
+
+    assert routing.move_atw("Paris FR") is route
+    assert route == routing.compute_route("Paris FR")
+
+
+def test_country_codes_ignore_case(routing):
+    assert routing.normalize_subset(None, ["GB", " fr", "gb", ""]) == (None, ("fr", "gb"))
+
+    upper = routing.compute_route("London GB", countries=routing.normalize_subset(None, ["GB", "FR"])[1])
+    lower = routing.compute_route("London GB", countries=("fr", "gb"))
+    assert len(upper) > 2
+    assert upper == lower
+
+
+def test_unknown_country_codes(routing):
+    with pytest.raises(ValueError, match="xx"):
+        routing.compute_route("London GB", countries=routing.normalize_subset(None, ["GB", "XX"])[1])
+
+
+def test_seed_of_the_random_strategy(routing):
+    assert routing.normalize_strategy("random", 5.0) == ("random", 5)
+    assert routing.normalize_strategy("random") == ("random", ids.RANDOM_SEED)
+    assert routing.normalize_strategy("fastest", 5) == ("fastest", None)
+    with pytest.raises(ValueError):
+        routing.normalize_strategy("random", -1)
+
+    keys = {routing.route_key("Paris FR", strategy="random", seed=seed) for seed in (5, 6)}
+    assert len(keys) == 2
+    route = routing.move_atw("Paris FR", strategy="random", seed=5)
+    assert route == routing.compute_route("Paris FR", strategy="random", seed=5)
+    assert route != routing.move_atw("Paris FR", strategy="random", seed=6)
+
+
+def test_seed_input_follows_the_strategy(routing):
+    assert routing.toggle_seed("random") is False
+    assert routing.toggle_seed("fastest") is True
+    assert routing.toggle_seed(None) is True
+
+
+@pytest.mark.parametrize("strategy", ["fastest", "optimal"])
+def test_records_keep_the_float_population(routing, strategy):
+    # the compact dataset stores the population as integers
+    assert routing.cities_index().data["Population"].dtype.kind == "i"
+
+    route = routing.compute_route("Paris FR", 20_000.0, strategy=strategy)
+
+    assert all(type(record["Population"]) is float for record in route)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ids
+from optimizer import BudgetExceeded, NoRouteHome, RouteOptimizer, route_gap
+from tracing import RouteTracer
+from trip import TripBuilder
+from utils import calc_neighbors_home, calculate_neighbors, rank_candidates
+
+# subset of the test dataset small enough to optimize quickly, with loops from every anchor
+MIN_POPULATION = 20_000.0
+CITIES = ["Anadyr RU", "London GB", "Paris FR", "Tromso NO"]
+
+
+def _illegal_steps(routing, route: list[dict], min_population: float | None) -> list[int]:
+    """Replay `route` with the neighbor searches of the greedy route and return the
+    steps whose city is not one of the candidates the greedy route could choose from."""
+    index = routing.routing_index(route[0][ids.PLACE], min_population)
+    data = index.data
+    home = data[data[ids.PLACE] == route[0][ids.PLACE]]
+    home_long = home["Longitude"].iloc[0]
+    trip = TripBuilder(home.iloc[0])
+
+    illegal = []
+    for step, (record, following) in enumerate(zip(route, route[1:])):
+        current = pd.DataFrame([record])
+        if pd.isna(record["Dist_from_home"]):
+            # only the moves of the home zone know their distance from home
+            current = current.drop(columns=["Dist_from_home"])
+        if step and home_long - ids.DELTA_HOME <= record["Longitude"] <= home_long:
+            neighbors = calc_neighbors_home(current, data, home, trip, index=index)
+        else:
+            neighbors = calculate_neighbors(current, data, trip, index=index)
+        candidates = rank_candidates(neighbors, record["Country"])
+        match = np.flatnonzero(candidates.place == following[ids.PLACE])
+        if not match.size or candidates.time[match[0]] != following["Time"]:
+            illegal.append(step)
+        trip.append(pd.Series(following))
+    return illegal
+
+
+@pytest.mark.parametrize("city", CITIES)
+def test_optimal_route_is_a_legal_loop(routing, city):
+    route = routing.compute_route(city, MIN_POPULATION, strategy="optimal")
+
+    assert route[0][ids.PLACE] == route[-1][ids.PLACE] == city
+    assert len({record[ids.PLACE] for record in route}) == len(route) - 1
+    assert _illegal_steps(routing, route, MIN_POPULATION) == []
+
+
+# the greedy route gets back to the start from all of them
+@pytest.mark.parametrize("city, min_population", [(city, None) for city in CITIES]
+                         + [("London GB", MIN_POPULATION), ("Paris FR", MIN_POPULATION)])
+def test_optimal_route_is_not_slower_than_greedy(routing, city, min_population):
+    greedy = routing.compute_route(city, min_population)
+    optimal = routing.compute_route(city, min_population, strategy="optimal")
+
+    gap = route_gap(greedy, optimal)
+    assert gap.greedy_returned
+    assert gap.optimal_time <= gap.greedy_time
+    assert gap.gap >= 0
+
+
+def test_no_loop_home(routing):
+    # too few cities are left to get around the world
+    with pytest.raises(NoRouteHome):
+        routing.compute_route("Paris FR", 50_000.0, strategy="optimal")
+
+
+def test_budget(routing):
+    with pytest.raises(BudgetExceeded):
+        RouteOptimizer(routing.routing_index("Paris FR"), "Paris FR").solve(budget_s=0)
+
+
+def test_unknown_city(routing):
+    with pytest.raises(ValueError):
+        RouteOptimizer(routing.routing_index("Paris FR"), "Atlantis XX")
+
+
+def test_tracing(routing):
+    tracer = RouteTracer()
+    route = routing.compute_route("Paris FR", MIN_POPULATION, tracer=tracer, strategy="optimal")
+
+    counters = tracer.counters
+    assert counters["steps"] == counters["steps_optimize_east"] + counters["steps_optimize_home"]
+    # every city of the route was relaxed before the next one was reached
+    assert counters["steps"] >= len(route) - 1
+    assert counters["expansions"] >= counters["steps"] - counters["no_neighbors"]
+    assert routing.compute_route("Paris FR", MIN_POPULATION, strategy="optimal") == route
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from place_search import PlaceIndex, normalize_name
+
+
+@pytest.fixture(scope="module")
+def index():
+    places = {
+        "New York US": 8_336_817,
+        "York GB": 153_717,
+        "Yorkton CA": 16_343,
+        "São Paulo BR": 12_325_232,
+        "Sao Tome ST": 71_868,
+        "Saint-Étienne FR": 172_565,
+        "Stoke-on-Trent GB": 259_965,
+        "L'Aquila IT": 69_902,
+        "Paris FR": 2_138_551,
+        "Paris US": 24_171,
+    }
+    return PlaceIndex(pd.Series(list(places)), pd.Series(list(places.values()), dtype=float))
+
+
+def test_normalize_name():
+    assert normalize_name("São Paulo BR") == "sao paulo br"
+    assert normalize_name("Saint-Étienne FR") == "saint-etienne fr"
+    assert normalize_name("PARIS fr") == "paris fr"
+
+
+def test_prefix_of_any_word(index):
+    # most populated first
+    assert index.search("york") == ["New York US", "York GB", "Yorkton CA"]
+    assert index.search("yorkt") == ["Yorkton CA"]
+    assert index.search("trent") == ["Stoke-on-Trent GB"]
+    assert index.search("aquila") == ["L'Aquila IT"]
+
+
+def test_accents_and_case_are_ignored(index):
+    assert index.search("SAO") == ["São Paulo BR", "Sao Tome ST"]
+    assert index.search("étienne") == index.search("Etienne") == ["Saint-Étienne FR"]
+
+
+def test_country_code_only_after_the_city_name(index):
+    assert index.search("us") == []
+    assert index.search("paris us") == ["Paris US"]
+    assert index.search("paris") == ["Paris FR", "Paris US"]
+
+
+def test_limit(index):
+    assert index.search("york", limit=2) == ["New York US", "York GB"]
+    assert index.search("york", limit=0) == []
+    assert index.search("  ") == []
+    assert index.search("zzz") == []
+
+
+def test_search_the_cities(cities):
+    index = PlaceIndex(cities["City_Country"], cities["Population"])
+
+    assert index.search("paris")[0] == "Paris FR"
+    matches = index.search("a", limit=50)
+    assert len(matches) == 50
+    population = cities.set_index("City_Country")["Population"]
+    assert list(population[matches]) == sorted(population[matches], reverse=True)
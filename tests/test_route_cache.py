@@ -0,0 +1,44 @@
+from route_cache import RouteCache, RouteKey, dataset_fingerprint
+
+
+def test_digest_is_stable():
+    key = RouteKey("f" * 32, "London GB", (("delta_home", 10.0), ("min_population", 200000.0)))
+
+    # digests name the files on disk: they must not change between processes or versions
+    assert key.digest() == "4658efa4c1ea7ea6b198c89c16cac4af8d61da9ace4e063822e41ae176b5dede"
+    # the fingerprint is the directory, not part of the digest
+    assert key.digest() == key._replace(fingerprint="0" * 32).digest()
+    assert key.digest() != key._replace(city="Paris FR").digest()
+    assert key.digest() != key._replace(params=(("delta_home", 10.0),)).digest()
+
+
+def test_thresholds_share_a_key(routing):
+    # the UI sends the threshold as an int, the API as a float
+    from_ui = routing.route_key("London GB", *routing.normalize_subset(200_000, ["gb", "fr"]))
+    from_api = routing.route_key("London GB", *routing.normalize_subset(200_000.0, ["fr", "gb", "fr"]))
+
+    assert from_ui == from_api
+    assert from_ui.digest() == from_api.digest()
+    assert routing.normalize_subset(0, []) == (None, None)
+
+
+def test_fingerprint_follows_the_routing_columns(cities):
+    fingerprint = dataset_fingerprint(cities)
+
+    assert dataset_fingerprint(cities.copy()) == fingerprint
+    moved = cities.copy()
+    moved.loc[0, "Latitude"] += 1
+    assert dataset_fingerprint(moved) != fingerprint
+
+
+def test_cache_round_trip(tmp_path):
+    key = RouteKey("f" * 32, "London GB", ())
+    route = [{"City_Country": "London GB", "Time": 0.0}]
+
+    cache = RouteCache(directory=str(tmp_path))
+    assert cache.get(key) is None
+    cache.put(key, route)
+    # a new cache reads the route back from disk
+    assert RouteCache(directory=str(tmp_path)).get(key) == route
+    cache.invalidate(key)
+    assert RouteCache(directory=str(tmp_path)).get(key) is None
@@ -0,0 +1,65 @@
+import pytest
+from dash import Dash, html
+
+import route_service
+
+
+@pytest.fixture
+def client(routing, monkeypatch):
+    """Test client of the route API, on a service of its own."""
+    monkeypatch.setattr(route_service, "service", route_service.RouteService(workers=2))
+    app = Dash(__name__)
+    app.layout = html.Div()
+    route_service.register(app)
+    return app.server.test_client()
+
+
+def test_route(client):
+    response = client.get("/api/route", query_string={"city": "Paris FR"})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["route"][0]["City_Country"] == body["route"][-1]["City_Country"] == "Paris FR"
+    assert body["stops"] == len(body["route"])
+
+
+def test_country_codes_ignore_case(client):
+    upper = client.get("/api/route", query_string={"city": "London GB", "countries": "GB,FR"})
+    lower = client.get("/api/route", query_string={"city": "London GB", "countries": "gb,fr"})
+
+    assert upper.status_code == lower.status_code == 200
+    assert upper.get_json() == lower.get_json()
+    assert upper.get_json()["stops"] > 2
+
+
+@pytest.mark.parametrize("query", [{}, {"city": "Atlantis XX"}, {"city": "London GB", "countries": "GB,XX"},
+                                   {"city": "London GB", "strategy": "teleport"}])
+def test_bad_requests(client, query):
+    response = client.get("/api/route", query_string=query)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_no_optimal_loop(client):
+    response = client.get("/api/route", query_string={"city": "Paris FR", "min_population": 50_000,
+                                                      "strategy": "optimal"})
+
+    assert response.status_code == 422
+
+
+def test_optimizer_budget(client, monkeypatch):
+    def exceed(*args):
+        raise route_service.BudgetExceeded("The optimal route needs more than the budget.")
+
+    monkeypatch.setattr(route_service.routing, "move_atw", exceed)
+    response = client.get("/api/route", query_string={"city": "Paris FR", "strategy": "optimal"})
+
+    assert response.status_code == 504
+    assert "budget" in response.get_json()["error"]
+
+
+def test_population_is_a_float(client):
+    body = client.get("/api/route", query_string={"city": "Paris FR"}).get_json()
+
+    assert all(isinstance(record["Population"], float) for record in body["route"])
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from import_data import ROUTING_COLUMNS
+from spatial_index import CityIndex
+from utils import delta_longitude, distances_from
+
+# reference points: a dense region, the antimeridian, the poles' neighborhood, the sparse Pacific
+POINTS = [(2.3488, 48.8534), (179.9, 64.7), (-179.5, -16.0), (18.957, 85.0), (-171.7667, -13.8333)]
+
+
+@pytest.fixture(scope="module")
+def index(cities):
+    return CityIndex(cities[ROUTING_COLUMNS])
+
+
+def _brute_east_window(index, longitude, latitude, delta):
+    """Positions of the eastward window of a point, by scanning every city."""
+    delta_long = delta_longitude(index.longitude, longitude)
+    keep = (delta_long > 0) & (delta_long <= delta) & (np.abs(index.latitude - latitude) <= delta)
+    return np.flatnonzero(keep)
+
+
+@pytest.mark.parametrize("longitude, latitude", POINTS)
+@pytest.mark.parametrize("delta", [1, 4, 16, 64])
+def test_east_window_matches_a_scan(index, longitude, latitude, delta):
+    positions, delta_long = index.east_window(longitude, latitude, delta)
+
+    assert (positions == _brute_east_window(index, longitude, latitude, delta)).all()
+    assert (delta_long == delta_longitude(index.longitude[positions], longitude)).all()
+
+
+@pytest.mark.parametrize("longitude, latitude", POINTS)
+@pytest.mark.parametrize("delta", [2, 16, 64])
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_nearest_east_matches_a_scan(index, longitude, latitude, delta, k):
+    exclude = np.zeros(len(index), dtype=bool)
+    exclude[::7] = True
+
+    for mask in (None, exclude):
+        window = _brute_east_window(index, longitude, latitude, delta)
+        if mask is not None:
+            window = window[~mask[window]]
+        distance = distances_from(latitude, longitude, index.latitude[window], index.longitude[window])
+        expected = window[np.argsort(distance, kind="stable")[:k]]
+
+        assert (index.nearest_east(longitude, latitude, delta, k, exclude=mask) == expected).all()
+
+
+def test_box_matches_a_scan(index):
+    lon_min, lon_max, lat_min, lat_max = -10.0, 0.5, 40.0, 60.0
+    positions = index.box(lon_min, lon_max, lat_min, lat_max)
+
+    expected = np.flatnonzero((index.longitude >= lon_min) & (index.longitude <= lon_max)
+                              & (index.latitude >= lat_min) & (index.latitude <= lat_max))
+    assert positions.size and (positions == expected).all()
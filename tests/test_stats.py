@@ -0,0 +1,27 @@
+import math
+
+import pandas as pd
+
+from stats import compute_stats, trip_summary
+
+
+def test_stats_of_a_route(routing):
+    trip = pd.DataFrame.from_records(routing.move_atw("Paris FR"))
+
+    stats = compute_stats(trip)
+
+    assert stats["Visited cities"] == len(trip) - 1
+    assert stats["Total time in hours"] == trip["Time"].sum()
+    assert stats["Average longitudinal speed (degrees/hours)"] > 0
+    assert trip_summary(trip) is trip_summary(trip)
+
+
+def test_stats_of_the_first_stop(routing):
+    # the first poll of a streamed route only holds the starting city
+    trip = pd.DataFrame.from_records(routing.move_atw("Paris FR")[:1])
+
+    stats = compute_stats(trip)
+
+    assert stats["Visited cities"] == 0
+    assert stats["Average longitudinal speed (degrees/hours)"] == 0
+    assert not any(isinstance(value, float) and math.isnan(value) for value in stats.values())
@@ -0,0 +1,54 @@
+import pytest
+
+import ids
+from import_data import ROUTING_COLUMNS
+from spatial_index import CityIndex
+from strategies import STRATEGIES
+from successor_graph import SuccessorGraph
+from tracing import RouteTracer
+from test_main import ROUTES
+
+
+@pytest.fixture(scope="module")
+def built(cities):
+    """The successor graph of the test dataset, built once."""
+    return SuccessorGraph.build(CityIndex(cities[ROUTING_COLUMNS]))
+
+
+def _use_graph(routing, graph):
+    """Save `graph` where `main.successor_graph` reads it."""
+    graph.save(ids.SUCCESSOR_GRAPH_DIR, routing.cities_fingerprint())
+    routing.successor_graph.cache_clear()
+
+
+@pytest.fixture
+def graph(routing, built):
+    _use_graph(routing, built)
+    return built
+
+
+def test_save_and_load(routing, graph):
+    loaded = routing.successor_graph()
+
+    assert len(loaded) == len(graph) == len(routing.cities_index())
+    assert (loaded.targets == graph.targets).all()
+    assert (loaded.distance == graph.distance).all()
+
+
+@pytest.mark.parametrize("city", sorted(ROUTES))
+def test_routes_match_the_live_search(routing, graph, city):
+    tracer = RouteTracer()
+    route = routing.compute_route(city, tracer=tracer)
+
+    assert [record[ids.PLACE] for record in route] == ROUTES[city]["places"]
+    assert sum(record["Time"] for record in route) == ROUTES[city]["time"]
+    # most eastward steps are read from the graph
+    assert tracer.counters["graph_step"] > tracer.counters["graph_fallback"]
+
+
+@pytest.mark.parametrize("strategy", sorted(set(STRATEGIES) - {"fastest"}))
+def test_strategies_match_the_live_search(routing, built, strategy):
+    live = routing.compute_route("Paris FR", strategy=strategy, seed=7)
+    _use_graph(routing, built)
+
+    assert routing.compute_route("Paris FR", strategy=strategy, seed=7) == live
@@ -0,0 +1,32 @@
+import pandas as pd
+
+import ids
+from import_data import ROUTING_COLUMNS
+from synthetic_data import ANCHORS, EDGE_CASE_CITIES, generate_cities
+
+
+def test_same_arguments_same_dataset(cities):
+    pd.testing.assert_frame_equal(generate_cities(5_000), cities)
+    assert not generate_cities(5_000, seed=1).equals(cities)
+    assert not generate_cities(5_000, clustering=0.2).equals(cities)
+
+
+def test_layout(cities):
+    assert list(cities.columns) == ROUTING_COLUMNS
+    assert cities[ids.PLACE].is_unique
+    assert not cities.isna().any().any()
+    assert cities["Latitude"].between(-90, 90).all()
+    assert cities["Longitude"].between(-180, 180).all()
+    # anchors come first, at their real position
+    assert list(cities[ids.PLACE][:len(ANCHORS)]) == [f"{c} {cc.upper()}" for c, cc, *_ in ANCHORS]
+
+
+def test_size_and_edge_cases():
+    plain = generate_cities(1_000, edge_cases=False)
+    with_edges = generate_cities(1_000)
+
+    assert len(ANCHORS) + 990 <= len(plain) <= len(ANCHORS) + 1_000
+    assert len(with_edges) > len(plain) + 2 * EDGE_CASE_CITIES
+    assert (with_edges["Longitude"].abs() == 180).any()
+    assert (with_edges["Latitude"].abs() == 90).any()
+    assert with_edges.duplicated(["Latitude", "Longitude"]).any()
@@ -0,0 +1,30 @@
+from trip_store import TripStore
+
+
+def _records(stops: int) -> list[dict]:
+    return [{"City_Country": f"City {i}", "Time": 2.0} for i in range(stops)]
+
+
+def test_lru_eviction():
+    store = TripStore(max_entries=2)
+    store.put("a", _records(1))
+    store.put("b", _records(2))
+    store.get("a")
+    store.put("c", _records(3))
+
+    assert store.get("b") is None
+    assert len(store.get("a")) == 1 and len(store.get("c")) == 3
+
+
+def test_partial_trips_never_evict_completed_ones():
+    store = TripStore(max_entries=2, max_partial=1)
+    store.put("route", _records(5))
+    for stops in range(1, 100):
+        store.put("job:1", _records(stops), partial=True)
+    store.put("job:2", _records(3), partial=True)
+
+    assert len(store.get("route")) == 5
+    assert store.get("route", partial=True) is None
+    # one partial trip per job, the latest prefix, and only `max_partial` jobs
+    assert store.get("job:1", partial=True) is None
+    assert len(store.get("job:2", partial=True)) == 3
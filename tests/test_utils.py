@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from utils import distances_from, haversine, pairwise_distances
+
+
+def test_haversine_known_distance():
+    # London to Paris
+    assert haversine(51.5085, -0.1257, 48.8534, 2.3488) == pytest.approx(343.5, abs=1)
+    assert haversine(10.0, 170.0, 10.0, 170.0) == 0
+
+
+def test_pairwise_distances_match_one_point_at_a_time():
+    rng = np.random.default_rng(0)
+    lats1, lons1 = rng.uniform(-90, 90, 5), rng.uniform(-180, 180, 5)
+    lats2, lons2 = rng.uniform(-90, 90, 7), rng.uniform(-180, 180, 7)
+
+    matrix = pairwise_distances(lats1, lons1, lats2, lons2)
+
+    assert matrix.shape == (5, 7)
+    for i in range(5):
+        np.testing.assert_allclose(matrix[i], distances_from(lats1[i], lons1[i], lats2, lons2))
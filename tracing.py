@@ -0,0 +1,148 @@
+"""
+tracing.py
+----------
+
+Optional instrumentation of the route computation.
+
+A `RouteTracer` passed to `main.iter_route` (and from there to the neighbor
+searches of `utils.py`) records, for every step, which branch ran, each
+expansion of the search window with its candidate counts, the time spent in
+each phase and the city reached. With the "optimal" strategy, a step is one city
+relaxed by `optimizer.RouteOptimizer.solve` ("optimize_east" or "optimize_home"
+branch), which reaches no city. Steps can be streamed to a JSON lines file and
+are aggregated into summary counters. Without a tracer the routing code only
+pays a few `is not None` checks per step.
+
+Usage:
+    python tracing.py "London GB" --out trace.jsonl
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from typing import IO
+
+
+class RouteTracer:
+    """Collect a structured trace of a route computation, one record per step."""
+
+    def __init__(self, path: str | None = None, keep_steps: bool = True):
+        """
+        Args:
+            path (str | None, optional): JSON lines file the steps are written to as
+                they end. Defaults to None, writing nothing.
+            keep_steps (bool, optional): Keep the step records in `steps`. Defaults to True.
+        """
+        self.steps: list[dict] = []
+        self.counters: Counter = Counter()
+        self.phase_seconds: Counter = Counter()
+        self.keep_steps = keep_steps
+        self._file: IO[str] | None = open(path, "w", encoding="utf-8") if path else None
+        self._step: dict | None = None
+        self._last = 0.0
+
+    def __enter__(self) -> "RouteTracer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the JSON lines file, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def start_step(self, step: int, branch: str, city: str) -> None:
+        """Open the record of a step.
+
+        Args:
+            step (int): Index of the step, 0 for the first move.
+            branch (str): Which part of the algorithm runs: "east" or "home", or
+                "optimize_east" or "optimize_home" in the optimizer.
+            city (str): The city the step starts from.
+        """
+        self._step = {"step": step, "branch": branch, "from": city, "expansions": [], "phases_ms": {}}
+        self.counters[f"steps_{branch}"] += 1
+        self._last = time.perf_counter()
+
+    def expansion(self, delta: float, window: int, candidates: int) -> None:
+        """Record one search window of a neighbor search.
+
+        Args:
+            delta (float): Size of the window, in degrees.
+            window (int): Cities inside the window.
+            candidates (int): Cities left once visited and coincident cities are excluded.
+        """
+        self.counters["expansions"] += 1
+        self.counters["window_cities"] += window
+        if self._step is not None:
+            self._step["expansions"].append({"delta": delta, "window": window, "candidates": candidates})
+
+    def event(self, name: str) -> None:
+        """Count a notable event, e.g. a neighbor search finding no city."""
+        self.counters[name] += 1
+        if self._step is not None:
+            self._step.setdefault("events", []).append(name)
+
+    def mark(self, phase: str) -> None:
+        """Attribute the time elapsed since the previous mark (or the step start) to `phase`."""
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        self.phase_seconds[phase] += seconds
+        if self._step is not None:
+            self._step["phases_ms"][phase] = round(1000 * seconds, 4)
+
+    def end_step(self, city: str | None) -> None:
+        """Close the record of the current step.
+
+        Args:
+            city (str | None): The city reached, or None if the route stopped (or
+                the step is a relaxation of the optimizer).
+        """
+        step, self._step = self._step, None
+        if step is None:
+            return
+        step["to"] = city
+        step["ms"] = round(sum(step["phases_ms"].values()), 4)
+        self.counters["steps"] += 1
+        if self.keep_steps:
+            self.steps.append(step)
+        if self._file is not None:
+            self._file.write(json.dumps(step) + "\n")
+
+    def summary(self) -> dict:
+        """Aggregate the trace.
+
+        Returns:
+            dict: The counters, the total seconds per phase and the mean number of
+            expansions per step.
+        """
+        steps = self.counters["steps"]
+        return {
+            "counters": dict(self.counters),
+            "phase_seconds": {phase: round(s, 4) for phase, s in self.phase_seconds.items()},
+            "expansions_per_step": round(self.counters["expansions"] / steps, 3) if steps else 0.0,
+        }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Trace the route computation from a city.")
+    parser.add_argument("city", help="starting city, e.g. 'London GB'")
+    parser.add_argument("--out", help="JSON lines file receiving one record per step")
+    parser.add_argument("--strategy", default="fastest", help="routing strategy, see strategies.py")
+    parser.add_argument("--seed", type=int, help="seed of the random strategy")
+    args = parser.parse_args(argv)
+
+    # imported here so the tracer itself does not load the routing data
+    import main as routing
+
+    strategy, seed = routing.normalize_strategy(args.strategy, args.seed)
+    with RouteTracer(args.out, keep_steps=False) as tracer:
+        routing.compute_route(args.city, tracer=tracer, strategy=strategy, seed=seed)
+    print(json.dumps(tracer.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+import ids
+
+# columns exported as floats whatever their dtype in the routing data: `import_data.compact_dtypes`
+# stores the population as integers, while the records keep the float layout of the cleaned data
+FLOAT_COLUMNS = frozenset({"Population"})
+
+
+class TripBuilder:
+    """Accumulate the stops of a trip with O(1) appends.
+
+    Each stop is stored as a tuple of values aligned with `columns`, so growing the
+    trip never copies the stops collected so far. Columns first seen on a later stop
+    (e.g. "Dist_from_home" on the way home) are appended to `columns` and filled
+    with NaN for the earlier stops when the trip is exported.
+
+    The places visited after the start are also kept in a set, so neighbor searches
+    can exclude them without scanning the whole trip.
+    """
+
+    __slots__ = ("columns", "visited", "_column_pos", "_rows")
+
+    def __init__(self, start: pd.Series, **extra: float):
+        """
+        Args:
+            start (pd.Series): The starting city's row.
+            **extra (float): Additional values stored on the starting stop only,
+                e.g. zeroed travel metrics.
+        """
+        self.columns: list[str] = []
+        self.visited: set[str] = set()
+        self._column_pos: dict[str, int] = {}
+        self._rows: list[tuple] = []
+
+        self._add(list(start.items()) + list(extra.items()))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _add(self, items: list[tuple]) -> None:
+        """Store one stop given as (column, value) pairs."""
+        for column, _ in items:
+            if column not in self._column_pos:
+                self._column_pos[column] = len(self.columns)
+                self.columns.append(column)
+
+        values = [np.nan] * len(self.columns)
+        for column, value in items:
+            # store plain Python scalars, as DataFrame.to_dict('records') does
+            value = value.item() if isinstance(value, np.generic) else value
+            values[self._column_pos[column]] = float(value) if column in FLOAT_COLUMNS else value
+        self._rows.append(tuple(values))
+
+    def append(self, stop: pd.Series) -> None:
+        """Add a stop to the trip and mark its place as visited.
+
+        Args:
+            stop (pd.Series): The row of the city reached, including travel metrics.
+        """
+        self._add(list(stop.items()))
+        self.visited.add(stop[ids.PLACE])
+
+    def is_visited(self, places: np.ndarray) -> np.ndarray:
+        """Check which places were already visited after the start.
+
+        Args:
+            places (np.ndarray): Place names (`ids.PLACE` values) to check.
+
+        Returns:
+            np.ndarray: Boolean mask, True where the place was already visited.
+        """
+        return np.fromiter(map(self.visited.__contains__, places), dtype=bool, count=len(places))
+
+    def __getitem__(self, i: int) -> dict:
+        """Return stop `i` as a record dictionary, in the layout of `to_records`."""
+        row = self._rows[i]
+        return dict(zip(self.columns, row + (np.nan,) * (len(self.columns) - len(row))))
+
+    def to_records(self) -> list[dict]:
+        """Export the trip in the `DataFrame.to_dict('records')` layout used by the `trip` store.
+
+        Returns:
+            list[dict]: One dictionary per stop, all sharing the same keys.
+        """
+        return [self[i] for i in range(len(self._rows))]
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import ids
+
+
+class TripStore:
+    """Bounded in-memory LRU of trips in columnar form, shared by the UI callbacks.
+
+    The `trip` dcc.Store only holds a small handle naming a trip. Every callback
+    reading it resolves the handle here, so the records are converted to a
+    DataFrame once per trip and never travel to the browser and back.
+
+    Partial trips of the routes being streamed are kept in an LRU of their own,
+    so the many prefixes of a streamed route never evict the completed routes
+    the page still displays.
+    """
+
+    def __init__(self, max_entries: int = ids.TRIP_STORE_SIZE, max_partial: int = ids.ROUTE_JOBS_MAX):
+        """
+        Args:
+            max_entries (int, optional): Completed trips kept. Defaults to `ids.TRIP_STORE_SIZE`.
+            max_partial (int, optional): Partial trips kept. Defaults to `ids.ROUTE_JOBS_MAX`,
+                one per route that can be streamed at a time.
+        """
+        self.max_entries = max_entries
+        self.max_partial = max_partial
+        self._frames: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._partial: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, handle_id: str, partial: bool = False) -> pd.DataFrame | None:
+        """Return the trip stored under `handle_id`, or None if it is not (or no longer) held.
+
+        Args:
+            handle_id (str): Identifier of the trip.
+            partial (bool, optional): Look among the partial trips. Defaults to False.
+
+        Returns:
+            pd.DataFrame | None: The trip, one row per visited city.
+        """
+        frames = self._partial if partial else self._frames
+        with self._lock:
+            if handle_id not in frames:
+                return None
+            frames.move_to_end(handle_id)
+            return frames[handle_id]
+
+    def put(self, handle_id: str, records: list[dict], partial: bool = False) -> pd.DataFrame:
+        """Convert a trip to columnar form and store it, evicting the least recently used.
+
+        Args:
+            handle_id (str): Identifier of the trip; a partial trip replaces the previous
+                one stored under the same id.
+            records (list[dict]): The trip records, one per visited city.
+            partial (bool, optional): Store it among the partial trips. Defaults to False.
+
+        Returns:
+            pd.DataFrame: The stored trip.
+        """
+        frame = pd.DataFrame.from_records(records)
+        frames, max_entries = (self._partial, self.max_partial) if partial else (self._frames, self.max_entries)
+        with self._lock:
+            frames[handle_id] = frame
+            frames.move_to_end(handle_id)
+            while len(frames) > max_entries:
+                frames.popitem(last=False)
+        return frame
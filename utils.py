@@ -1,11 +1,97 @@
-from math import radians, asin, sin, cos, sqrt
-from collections.abc import Callable
+import logging
+from math import radians
+from typing import NamedTuple, TYPE_CHECKING
+import numpy as np
 import pandas as pd
 
 import ids
 
+if TYPE_CHECKING:
+    from spatial_index import CityIndex
+    from trip import TripBuilder
+    from tracing import RouteTracer
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0  # Earth's arithmetic mean radius
+
+
+def haversine(lat1: float | np.ndarray, lon1: float | np.ndarray,
+              lat2: float | np.ndarray, lon2: float | np.ndarray) -> np.ndarray:
+    """Compute great-circle distances with the Haversine formula on NumPy arrays.
+
+    All arguments are in degrees and are broadcast against each other, so any mix
+    of scalars and equally-shaped arrays is accepted.
+
+    Args:
+        lat1 (float | np.ndarray): Latitude(s) of the starting point(s).
+        lon1 (float | np.ndarray): Longitude(s) of the starting point(s).
+        lat2 (float | np.ndarray): Latitude(s) of the destination point(s).
+        lon2 (float | np.ndarray): Longitude(s) of the destination point(s).
+
+    Returns:
+        np.ndarray: The distances in kilometers, with the broadcast shape of the inputs.
+    """
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    lon2 = np.asarray(lon2, dtype=np.float64)
+
+    dist_lat = np.radians(lat2 - lat1)
+    dist_lon = np.radians(lon2 - lon1)
+
+    a = (np.sin(dist_lat / 2) ** 2
+         + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dist_lon / 2) ** 2)
+
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def distances_from(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Compute the distances from one point to many points in a single vectorized pass.
+
+    Args:
+        lat (float): Latitude of the reference point in degrees.
+        lon (float): Longitude of the reference point in degrees.
+        lats (np.ndarray): Latitudes of the other points in degrees.
+        lons (np.ndarray): Longitudes of the other points in degrees.
+
+    Returns:
+        np.ndarray: One distance in kilometers for each of the other points.
+    """
+    return haversine(lat, lon, lats, lons)
+
+
+def pairwise_distances(lats1: np.ndarray, lons1: np.ndarray, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Compute the distance matrix between two sets of points.
+
+    Args:
+        lats1 (np.ndarray): Latitudes of the first set of points in degrees.
+        lons1 (np.ndarray): Longitudes of the first set of points in degrees.
+        lats2 (np.ndarray): Latitudes of the second set of points in degrees.
+        lons2 (np.ndarray): Longitudes of the second set of points in degrees.
+
+    Returns:
+        np.ndarray: A (len(lats1), len(lats2)) matrix of distances in kilometers.
+    """
+    return haversine(np.asarray(lats1)[:, np.newaxis], np.asarray(lons1)[:, np.newaxis],
+                     np.asarray(lats2)[np.newaxis, :], np.asarray(lons2)[np.newaxis, :])
+
+
+def delta_longitude(longitude: float | np.ndarray, start_long: float) -> np.ndarray:
+    """Compute the signed longitudinal difference from `start_long`, wrapped to [-180°, 180°).
+
+    Args:
+        longitude (float | np.ndarray): Longitude(s) in degrees.
+        start_long (float): Reference longitude in degrees.
+
+    Returns:
+        np.ndarray: The difference in degrees; positive values lie east of `start_long`.
+    """
+    return (np.asarray(longitude) - start_long + 180) % 360 - 180
+
+
 class Distance:
-    R = 6371.0  # Earth's arithmetic mean radius
+    R = EARTH_RADIUS_KM
 
     def __init__(self, current):
         self.latitude = current["Latitude"]
@@ -62,22 +148,21 @@ class Distance:
         Returns:
             float: The distance between the two points in kilometers.
         """
-        dist_lat = self.lat_distance(other)
-        dist_lon = self.long_distance(other)
-
-        # convert both latitudes to radians (for the cosine term)
-        lat1 = radians(self.latitude)
-        lat2 = radians(other.latitude)
+        return float(haversine(self.latitude, self.longitude, other.latitude, other.longitude))
 
-        a = (sin(dist_lat / 2) ** 2
-             + cos(lat1) * cos(lat2) * sin(dist_lon / 2) ** 2)
 
-        c = 2 * asin(sqrt(a))
-        return self.R * c
+def _get_index(data: pd.DataFrame, index: "CityIndex | None") -> "CityIndex":
+    """Return `index`, or build a throwaway one over `data` when none is given."""
+    if index is not None:
+        return index
+    # imported here since spatial_index depends on the distance kernels of this module
+    from spatial_index import CityIndex
+    return CityIndex(data)
 
 
-def calculate_neighbors(current: pd.DataFrame, data: pd.DataFrame, trip: pd.DataFrame, delta: float = 1,
-                        delta_max: float = 90, verbose: bool = False) -> pd.DataFrame:
+def calculate_neighbors(current: pd.DataFrame, data: pd.DataFrame, trip: "TripBuilder", delta: float = 1,
+                        delta_max: float = 90, index: "CityIndex | None" = None,
+                        tracer: "RouteTracer | None" = None) -> pd.DataFrame:
     """Identify neighboring cities located eastward within a specified angular range.
 
         This function selects all cities from the `data` DataFrame whose longitude lies
@@ -88,61 +173,62 @@ def calculate_neighbors(current: pd.DataFrame, data: pd.DataFrame, trip: pd.Data
             current (pd.DataFrame): A single-row DataFrame containing the reference city's
                 coordinates, with columns "Latitude" and "Longitude".
             data (pd.DataFrame): The full dataset of cities, containing the same columns.
-            trip (pd.DataFrame): The dataset containing visited cities.
+            trip (TripBuilder): The trip built so far, holding the visited cities.
             delta (float, optional): Initial angular threshold (degrees) for both longitude and latitude. Defaults to 1.
             delta_max (float, optional): Maximum threshold (degrees). Defaults to 90.
-            verbose (bool, optional): If True, print each expansion step.
+            index (CityIndex, optional): Spatial index built over `data`. Building one is
+                expensive, so callers doing repeated searches should pass a prebuilt index.
+            tracer (RouteTracer, optional): Records each expansion of the search window.
 
         Returns:
             pd.DataFrame: A subset of `data` containing the neighboring cities that satisfy
             the specified angular constraints.
         """
+    index = _get_index(data, index)
     dist = Distance(current)
     start_long = dist.longitude
     start_lat = dist.latitude
-    delta_long = (data["Longitude"] - start_long + 180) % 360 - 180
 
     while delta <= delta_max:
 
-        # Compute eastward longitudinal difference (0°–360° range)
-        # It correctly handles the 180° meridian crossing, but requires delta < 180° to avoid including westward points
-        mask = (
-                (delta_long <= delta) &
-                (delta_long > 0) &
-                (data["Latitude"] >= (start_lat - delta)) &
-                (data["Latitude"] <= (start_lat + delta))
-        )
+        # Query the eastward window (0°, delta] wrapping at the 180° meridian
+        # It requires delta < 180° to avoid including westward points
+        positions, delta_long = index.east_window(start_long, start_lat, delta)
 
-        neighbors = data.loc[mask].copy()
+        if positions.size:
+            neighbors = data.iloc[positions].copy()
+            neighbors["Dist_long"] = abs(delta_long)
 
-        if not neighbors.empty:
-            neighbors["Dist_long"] = abs(delta_long[mask])
-
-            neighbors["Distance_km"] = neighbors.apply(
-                lambda row: dist.distance_to(Distance({"Latitude": row["Latitude"], "Longitude": row["Longitude"]})),
-                axis=1)
+            neighbors["Distance_km"] = distances_from(start_lat, start_long,
+                                                      neighbors["Latitude"].to_numpy(),
+                                                      neighbors["Longitude"].to_numpy())
 
             # exclude rows where distance is zero
             neighbors = neighbors[neighbors["Distance_km"] != 0].copy()
             # Exclude already visited cities except home
-            neighbors = neighbors[~neighbors[ids.PLACE].isin(trip[ids.PLACE].iloc[1:])]
+            neighbors = neighbors[~trip.is_visited(neighbors[ids.PLACE].to_numpy())]
+            if tracer is not None:
+                tracer.expansion(delta, positions.size, len(neighbors))
 
             # stop expanding if we have 3 or more neighbors
             if len(neighbors) >= 3 or delta == delta_max:
                 return neighbors
+        elif tracer is not None:
+            tracer.expansion(delta, 0, 0)
 
         # expand the search area
         delta *= 2
-        if verbose:
-            print(f"No nearby cities found within ±{delta / 2}°, expanding to ±{delta}°")
 
     # if no cities found even at max_delta
-    print("No neighboring cities found within the maximum search range.")
+    logger.debug("No neighboring cities found within the maximum search range.")
+    if tracer is not None:
+        tracer.event("no_neighbors")
     return pd.DataFrame()
 
 
-def calc_neighbors_home(current: pd.DataFrame, data: pd.DataFrame, home: pd.DataFrame, trip: pd.DataFrame,
-                        delta: float = 1, delta_max: float = 180, verbose: bool = False) -> pd.DataFrame:
+def calc_neighbors_home(current: pd.DataFrame, data: pd.DataFrame, home: pd.DataFrame, trip: "TripBuilder",
+                        delta: float = 1, delta_max: float = 180, index: "CityIndex | None" = None,
+                        tracer: "RouteTracer | None" = None) -> pd.DataFrame:
     """
     Identify neighboring cities when approaching the home city.
 
@@ -155,168 +241,168 @@ def calc_neighbors_home(current: pd.DataFrame, data: pd.DataFrame, home: pd.Data
                 coordinates, with columns "Latitude" and "Longitude".
         data (pd.DataFrame): The full dataset of cities, containing the same columns.
         home (pd.DataFrame): Single-row DataFrame representing the home city.
-        trip (pd.DataFrame): The dataset containing visited cities.
+        trip (TripBuilder): The trip built so far, holding the visited cities.
         delta (float, optional): Initial angular threshold (degrees) for latitude. Defaults to 1.
         delta_max (float, optional): Maximum threshold (degrees). Defaults to 180.
-        verbose (bool, optional): If True, print each expansion step.
+        index (CityIndex, optional): Spatial index built over `data`. Building one is
+            expensive, so callers doing repeated searches should pass a prebuilt index.
+        tracer (RouteTracer, optional): Records each expansion of the search window.
 
     Returns:
             pd.DataFrame: A subset of `data` containing the neighboring cities that satisfy
             the specified angular constraints.
     """
+    index = _get_index(data, index)
     dist = Distance(current)
     home_dist = Distance(home)
 
     start_long = dist.longitude
     start_lat = dist.latitude
     home_long = home_dist.longitude
-    delta_long = (data["Longitude"] - start_long + 180) % 360 - 180
+    neighbors = pd.DataFrame()
 
     while delta <= delta_max:
 
-        mask = (
-                (data["Longitude"] >= home_long - ids.DELTA_HOME) &
-                (data["Longitude"] <= home_long) &
-                (data["Latitude"] >= (start_lat - delta)) &
-                (data["Latitude"] <= (start_lat + delta))
-        )
+        positions = index.box(home_long - ids.DELTA_HOME, home_long, start_lat - delta, start_lat + delta)
 
-        neighbors = data.loc[mask].copy()
-
-        if not neighbors.empty:
-            neighbors["Dist_long"] = abs(delta_long[mask])
+        if positions.size:
+            neighbors = data.iloc[positions].copy()
+            neighbors["Dist_long"] = abs(delta_longitude(index.longitude[positions], start_long))
 
-            neighbors["Distance_km"] = neighbors.apply(
-                lambda row: dist.distance_to(
-                    Distance({"Latitude": row["Latitude"], "Longitude": row["Longitude"]})
-                ), axis=1
-            )
+            lats = neighbors["Latitude"].to_numpy()
+            lons = neighbors["Longitude"].to_numpy()
 
-            neighbors["Dist_from_home"] = neighbors.apply(
-                lambda row: home_dist.distance_to(
-                    Distance({"Latitude": row["Latitude"], "Longitude": row["Longitude"]})
-                ), axis=1
-            )
+            neighbors["Distance_km"] = distances_from(start_lat, start_long, lats, lons)
+            neighbors["Dist_from_home"] = distances_from(home_dist.latitude, home_long, lats, lons)
 
             neighbors = neighbors[neighbors["Distance_km"] != 0].copy()
             # Exclude already visited cities except home
-            neighbors = neighbors[~neighbors[ids.PLACE].isin(trip[ids.PLACE].iloc[1:])]
+            neighbors = neighbors[~trip.is_visited(neighbors[ids.PLACE].to_numpy())]
             if not current.empty and "Dist_from_home" in current.columns:
                 neighbors = neighbors[neighbors["Dist_from_home"] < current["Dist_from_home"].iloc[0]].copy()
 
+        if tracer is not None:
+            tracer.expansion(delta, positions.size, len(neighbors))
+
         if not neighbors.empty:
             return neighbors
 
         delta *= 2
-        if verbose:
-            print(f"No nearby cities found within ±{delta / 2}°, expanding to ±{delta}°")
 
-    print("No cities found even at maximum search range.")
+    logger.debug("No cities found even at maximum search range.")
+    if tracer is not None:
+        tracer.event("no_neighbors")
     return pd.DataFrame()
 
 
-def get_top3(df: pd.DataFrame, n: int = 3, sort_by: str = "Distance_km") -> pd.DataFrame:
-    """Return up to `n` nearest cities sorted by `sort_by` (default: 'Distance_km').
+def nearest_positions(distance: np.ndarray, n: int = 3) -> np.ndarray:
+    """Return the positions of the `n` smallest distances, nearest first.
 
-    If fewer than `n` cities are available, return all of them.
-    Prints a message if the DataFrame is empty.
+    Ties are broken by position, so the nearest of equally distant cities is the
+    first row. The cost is linear in the number
+    of distances, whatever `n`.
 
     Args:
-        df (pd.DataFrame): DataFrame of cities with a distance column.
-        n (int, optional): Max number of cities to return. Defaults to 3.
-        sort_by (str, optional): Column used for sorting. Defaults to 'Distance_km'.
+        distance (np.ndarray): Distance of each candidate.
+        n (int, optional): Max number of positions to return. Defaults to 3.
 
     Returns:
-        pd.DataFrame: Subset of up to `n` nearest cities.
+        np.ndarray: Up to `n` positions into `distance`.
     """
-    if df.empty:
-        print("No cities found.")
-        return df
+    if distance.size > n:
+        # every value up to the n-th smallest, ties at the boundary included
+        kth = np.partition(distance, n - 1)[n - 1]
+        candidates = np.flatnonzero(distance <= kth)
+    else:
+        candidates = np.arange(distance.size)
+    return candidates[np.argsort(distance[candidates], kind="stable")[:n]]
 
-    # takes the minimum between integer 'n' and length of 'df'
-    # it manages the case when we have less than 3 cities near our current one
-    nearest = df.nsmallest(min(len(df),n), sort_by)
-    return nearest.reset_index(drop=True)
 
+def travel_times(population: np.ndarray, foreign: np.ndarray) -> np.ndarray:
+    """Compute the travel time to candidates ranked by distance, nearest first.
 
-def calculate_time(row: pd.Series, country: str) -> int:
-    """Compute travel time for a city based on its distance from current point and other properties.
+    The time doubles with each rank (2, 4, 8) and is 2 units longer to reach another country
+    and to reach a city of more than `ids.LARGE_CITY` inhabitants.
 
     Args:
-        row (pd.Series): A row from the DataFrame.
-        country (str): The reference country.
+        population (np.ndarray): Population of each candidate, in rank order.
+        foreign (np.ndarray): Whether each candidate is in another country than the current city.
 
     Returns:
-        int: The computed travel time.
+        np.ndarray: The travel time of each candidate.
     """
-    index = int(str(row.name))
-    t = 2 ** (index + 1)
-    if row["Country"] != country:
-        t += 2
-    if row["Population"] > 200000:
-        t += 2
-    return t
+    rank = np.arange(population.size)
+    return 2.0 ** (rank + 1) + 2 * foreign + 2 * (population > ids.LARGE_CITY)
 
 
-def create_move(df: pd.DataFrame, method: Callable[[pd.DataFrame], pd.Series]) -> pd.Series:
-    """
-    Apply a given selection strategy to choose the next city.
+class Candidates(NamedTuple):
+    """The nearest neighbors of the current city with their travel scores, as aligned arrays.
 
-    Args:
-        df (pd.DataFrame): DataFrame containing nearby cities and travel metrics (e.g. distances, times).
-        method (Callable[[pd.DataFrame], pd.Series]):
-            Function defining how to select the next city, such as `fastest_long` or a custom rule.
-
-    Returns:
-        pd.Series: The selected city's row, representing the next destination.
-    """
-    return method(df)
-
-def fastest_long(df: pd.DataFrame) -> pd.Series:
+    Routing strategies (see `strategies.py`) choose the next city among them.
     """
-    Select the city with the highest longitudinal speed (Dist_long / Time).
+    positions: np.ndarray  # rows in the neighbors frame (or the routing data), nearest first
+    place: np.ndarray
+    population: np.ndarray
+    foreign: np.ndarray  # in another country than the current city
+    distance_km: np.ndarray
+    dist_long: np.ndarray
+    time: np.ndarray
+    speed: np.ndarray  # dist_long / time
+    dist_from_home: np.ndarray | None = None  # only when approaching home
 
-    Args:
-        df (pd.DataFrame): Inherited from `create_move`
-
-    Returns:
-        pd.Series: The row corresponding to the city that maximizes Dist_long / Time.
-    """
-    df = df.copy() # to avoid warnings
-    df["Speed"] = df["Dist_long"] / df["Time"]
-    return df.loc[df["Speed"].idxmax()]
 
-def closest_to_home(df: pd.DataFrame) -> pd.Series:
-    """
-    Return the city closest to the home city based on 'Dist_from_home'.
+def rank_candidates(neighbors: pd.DataFrame, country: str, n: int = 3) -> Candidates:
+    """Score the `n` nearest neighbors of the current city in one vectorized pass.
 
     Args:
-        df (pd.DataFrame): Inherited from `create_move`
+        neighbors (pd.DataFrame): Output of `calculate_neighbors` or `calc_neighbors_home`.
+        country (str): Country of the current city.
+        n (int, optional): Number of candidates. Defaults to 3.
 
     Returns:
-        pd.Series: The row corresponding to the city with the minimum distance to the home city.
+        Candidates: The scores of the candidates, nearest first; empty if there is no neighbor.
     """
-    df = df.copy()  # to avoid warnings
-    df["Speed"] = df["Dist_long"] / df["Time"]
-    return df.loc[df["Dist_from_home"].idxmin()]
-
-def go_home(df: pd.DataFrame, start_city: str) -> pd.Series:
+    if neighbors.empty:
+        empty = np.empty(0)
+        return Candidates(np.empty(0, dtype=np.int64), empty.astype(object), empty, empty.astype(bool),
+                          empty, empty, empty, empty)
+
+    top = nearest_positions(neighbors["Distance_km"].to_numpy(), n)
+    population = neighbors["Population"].to_numpy()[top]
+    foreign = neighbors["Country"].to_numpy()[top] != country
+    time = travel_times(population, foreign)
+    dist_long = neighbors["Dist_long"].to_numpy()[top]
+    return Candidates(
+        positions=top,
+        place=neighbors[ids.PLACE].to_numpy()[top],
+        population=population,
+        foreign=foreign,
+        distance_km=neighbors["Distance_km"].to_numpy()[top],
+        dist_long=dist_long,
+        time=time,
+        speed=dist_long / time,
+        dist_from_home=(neighbors["Dist_from_home"].to_numpy()[top]
+                        if "Dist_from_home" in neighbors.columns else None),
+    )
+
+
+def homeward_candidate(candidates: Candidates, start_city: str) -> int:
+    """Return the index of the starting city among the candidates, or else of the closest one to it."""
+    home = np.flatnonzero(candidates.place == start_city)
+    if home.size:
+        return int(home[0])
+    return int(np.argmin(candidates.dist_from_home))
+
+
+def with_metrics(row: pd.Series, **metrics: float) -> pd.Series:
+    """Return a copy of `row` with new labels holding `metrics`.
+
+    The row is rebuilt once, since setting a new label on a Series copies it each time.
     """
-        Select the next city when returning toward the starting point.
+    return pd.Series([*row.to_numpy(dtype=object), *metrics.values()], index=[*row.index, *metrics],
+                     dtype=object, name=row.name)
 
-        If the starting city (e.g., London) is among the nearby cities, it is immediately chosen.
-        Otherwise, the function selects the city closest to the home city based on `Dist_from_home`,
-        ensuring movement stays directed toward the destination.
 
-        Args:
-            df (pd.DataFrame): Inherited from `create_move`
-            start_city (str): Name of the starting city (used to detect when it's reachable).
-
-        Returns:
-            pd.Series: The selected city's row, representing the next move toward home.
-    """
-    df = df.copy() # to avoid warnings
-    if start_city in df[ids.PLACE].values:
-        df["Speed"] = df["Dist_long"] / df["Time"]
-        return df[df[ids.PLACE] == start_city].iloc[0, :] # to get a pd.Series and not a pd.DataFame
-    return closest_to_home(df)
\ No newline at end of file
+def candidate_row(neighbors: pd.DataFrame, candidates: Candidates, i: int) -> pd.Series:
+    """Return the row of candidate `i` with its "Time" and "Speed", as the next stop of the trip."""
+    return with_metrics(neighbors.iloc[candidates.positions[i]], Time=candidates.time[i], Speed=candidates.speed[i])